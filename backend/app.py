@@ -7,9 +7,24 @@ import uuid
 import time
 import json
 import shutil
-from flask import Flask, request, jsonify, send_file, render_template, session
+import hashlib
+from flask import Flask, Response, request, jsonify, send_file, render_template, session, g, stream_with_context
 from io import BytesIO
 from backend.image_processor import ImageProcessor
+from backend.methods import (METHOD_FUNCTIONS, STATS_METHODS, SHAPE_CHANGING_METHODS,
+                             parse_method_params, parse_steps, params_key,
+                             apply_method, output_encoding)
+from backend.coalescer import RequestCoalescer, SupersededError
+from backend.batch_processor import BatchProcessor
+from backend.video_processor import VideoProcessor
+from backend.image_stats import StatsCache
+from backend.point_lut import IMAGE_DEPENDENT_METHODS, compose_point_luts
+from backend.roi import parse_roi, parse_feather, apply_method_roi
+from backend.edit_history import HistoryStore
+from backend.frame_store import FrameStore, FRAME_STORE_SUPPORTED
+from backend.derivatives import parse_outputs, build_derivatives, encode_derivatives, derivatives_zip
+from backend.warmup import WarmUp
+from backend.progressive import SLOW_METHODS, preview_input, encode_preview, data_url, sse_event
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -27,6 +42,68 @@ if not os.path.exists(TEMP_DIR):
 # Initialize image processor
 processor = ImageProcessor()
 
+# Batch processor sharing the same ImageProcessor
+batch_processor = BatchProcessor(processor)
+
+# Frame-parallel video processor sharing the same ImageProcessor
+video_processor = VideoProcessor(processor)
+
+# Deduplicate identical in-flight enhancement requests
+coalescer = RequestCoalescer()
+
+# Intensity statistics per uploaded image, keyed by content hash
+stats_cache = StatsCache()
+
+# Per-image edit histories with checkpointed intermediate results
+history_store = HistoryStore(processor)
+
+# Decoded uploads shared between worker processes through memory-mapped files
+# (POSIX only; elsewhere every request decodes its own upload)
+frame_store = FrameStore(os.path.join(TEMP_DIR, 'frames')) if FRAME_STORE_SUPPORTED else None
+
+def load_upload(file_bytes, content_hash):
+    """
+    Decode an uploaded image once across all worker processes
+
+    Args:
+        file_bytes: Encoded image
+        content_hash: SHA-1 of file_bytes
+
+    Returns:
+        Image (a read-only view valid until the end of the request when the frame
+        store is in use), or None if decoding fails
+    """
+    decode = lambda: cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if frame_store is None:
+        return decode()
+    handle = frame_store.get_or_decode(content_hash, decode)
+    if handle is None:
+        return None
+    g.setdefault('frame_handles', []).append(handle)
+    return handle.array
+
+@app.teardown_request
+def release_frames(exc=None):
+    """Release the frames opened while handling the request"""
+    for handle in g.pop('frame_handles', []):
+        handle.release()
+
+# Runs every method once so the first request is not a cold start. It is started by the
+# server entrypoints (main.py, gunicorn.conf.py), never on import; /ready reports 503 until done
+warmup = WarmUp(processor)
+
+def start_warmup():
+    """Start the background warm-up of this worker unless PICWIZARD_WARMUP=0"""
+    if os.environ.get('PICWIZARD_WARMUP', '1') != '0':
+        warmup.start()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once warm-up has completed, 503 before"""
+    if os.environ.get('PICWIZARD_WARMUP', '1') == '0':
+        return jsonify({'ready': True, 'warmup': 'disabled'})
+    return jsonify(warmup.to_dict()), 200 if warmup.ready else 503
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -56,8 +133,9 @@ def enhance():
         file_bytes = file.read()
         logger.debug(f"Read {len(file_bytes)} bytes from uploaded file")
         
+        content_hash = hashlib.sha1(file_bytes).hexdigest()
         try:
-            img = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+            img = load_upload(file_bytes, content_hash)
             if img is None:
                 logger.error("Failed to decode image")
                 return jsonify({"error": "Invalid image format"}), 400
@@ -67,107 +145,282 @@ def enhance():
             logger.exception("Error during image decoding")
             return jsonify({"error": f"Image decoding error: {str(e)}"}), 400
         
-        # Get parameters and apply enhancement
+        # Get parameters and normalize them for the requested method
         params = request.form.to_dict()
         logger.debug(f"Applying {method} with params: {params}")
-        
-        if method == 'histogram_equalization':
-            result = processor.histogram_equalization(img)
-        elif method == 'gamma_correction':
-            gamma = float(params.get('gamma', 1.0))
-            result = processor.gamma_correction(img, gamma)
-        elif method == 'unsharp_mask':
-            amount = float(params.get('amount', 1.0))
-            radius = int(params.get('radius', 5))
-            result = processor.unsharp_mask(img, kernel_size=(radius, radius), amount=amount)
-        elif method == 'gaussian_blur':
-            radius = int(params.get('radius', 5))
-            result = processor.gaussian_blur(img, radius)
-        elif method == 'edge_detection':
-            detection_method = params.get('detection_method', 'sobel')
-            threshold1 = int(params.get('threshold1', 100))
-            threshold2 = int(params.get('threshold2', 200))
-            result = processor.edge_detection(img, method=detection_method, threshold1=threshold1, threshold2=threshold2)
-        elif method == 'super_resolution':
-            scale_factor = int(params.get('scale_factor', 2))
-            result = processor.super_resolution(img, scale_factor=scale_factor)
-        elif method == 'color_balance':
-            r_factor = float(params.get('r_factor', 1.0))
-            g_factor = float(params.get('g_factor', 1.0))
-            b_factor = float(params.get('b_factor', 1.0))
-            result = processor.color_balance(img, r_factor=r_factor, g_factor=g_factor, b_factor=b_factor)
-        elif method == 'sepia_filter':
-            intensity = float(params.get('intensity', 0.5))
-            result = processor.sepia_filter(img, intensity=intensity)
-        elif method == 'noise_reduction':
-            strength = int(params.get('strength', 7))
-            result = processor.noise_reduction(img, strength=strength)
-        elif method == 'sharpen':
-            strength = float(params.get('strength', 1.0))
-            result = processor.sharpen(img, strength=strength)
-        # Medical image processing methods
-        elif method == 'clahe_enhance':
-            clip_limit = float(params.get('clip_limit', 2.0))
-            grid_size = int(params.get('grid_size', 8))
-            result = processor.clahe_enhance(img, clip_limit=clip_limit, grid_size=grid_size)
-        elif method == 'dicom_window':
-            window_width = int(params.get('window_width', 400))
-            window_level = int(params.get('window_level', 50))
-            result = processor.dicom_window(img, window_width=window_width, window_level=window_level)
-        elif method == 'enhance_vessels':
-            strength = float(params.get('strength', 1.5))
-            result = processor.enhance_vessels(img, strength=strength)
-        elif method == 'extract_palette':
+        try:
+            kwargs = parse_method_params(method, params)
+        except ValueError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 400
+
+        if method == 'extract_palette':
             # Extract color palette
-            num_colors = int(params.get('num_colors', 5))
-            palette = processor.extract_color_palette(img, num_colors=num_colors)
-            
+            palette = processor.extract_color_palette(img, **kwargs)
+
             # Return palette as JSON without encoding image
             return jsonify({
                 'method': method,
                 'palette': palette
             })
-        elif method == 'bit_plane_slicing':
-            bit_plane = int(params.get('bit_plane', 7))
-            result = processor.bit_plane_slicing(img, bit_plane=bit_plane)
-        elif method == 'log_transformation':
-            c = float(params.get('c', 1.0))
-            result = processor.log_transformation(img, c=c)
-        elif method == 'gray_level_slicing':
-            min_val = int(params.get('min_val', 100))
-            max_val = int(params.get('max_val', 200))
-            highlight_only = params.get('highlight_only', 'false').lower() == 'true'
-            result = processor.gray_level_slicing(img, min_val=min_val, max_val=max_val, highlight_only=highlight_only)
-        elif method == 'piecewise_linear':
-            # Parse points from JSON string
-            points_str = params.get('points', '[[0,0],[128,128],[255,255]]')
+
+        # Optional region of interest: a rectangle and/or an uploaded mask
+        try:
+            rect = parse_roi(params)
+            feather = parse_feather(params)
+        except ValueError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 400
+        mask = None
+        mask_hash = ''
+        if 'roi_mask' in request.files:
+            mask_bytes = request.files['roi_mask'].read()
+            mask = cv2.imdecode(np.frombuffer(mask_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if mask is None:
+                logger.error("Failed to decode ROI mask")
+                return jsonify({"error": "Invalid ROI mask format"}), 400
+            mask_hash = hashlib.sha1(mask_bytes).hexdigest()
+        use_roi = rect is not None or mask is not None
+        if use_roi and method in SHAPE_CHANGING_METHODS:
+            return jsonify({"error": f"{method} changes the image size and cannot be applied to a region"}), 400
+        if mask is not None and mask.shape != img.shape[:2]:
+            return jsonify({"error": "ROI mask must have the same size as the image"}), 400
+
+        # Optional list of output sizes/formats, returned together as a ZIP
+        specs = None
+        if params.get('outputs'):
             try:
-                points = json.loads(points_str)
-                # Validate points
-                if not points or not all(isinstance(p, list) and len(p) == 2 for p in points):
-                    raise ValueError("Invalid points format")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Invalid points format: {e}")
-                # Default to identity transform
-                points = [[0, 0], [128, 128], [255, 255]]
-                
-            result = processor.piecewise_linear_transform(img, points)
-        else:
-            logger.error(f"Unknown method: {method}")
-            return jsonify({"error": f"Unknown enhancement method: {method}"}), 400
-            
+                specs = parse_outputs(params['outputs'])
+            except ValueError as e:
+                logger.error(str(e))
+                return jsonify({"error": str(e)}), 400
+        base_filename = os.path.splitext(file.filename)[0] + '_enhanced'
+
+        # Identical requests (same content and params) share one computation
+        key = content_hash + ':' + params_key(method, kwargs)
+        if use_roi:
+            key += f':roi={rect}:{mask_hash}:{feather}'
+        if specs is not None:
+            key += ':outputs=' + json.dumps(specs, sort_keys=True) + ':' + base_filename
+        client_id = request.form.get('client_id') or request.headers.get('X-Client-Id')
+        seq = request.form.get('seq', type=int)
+        coalescer.register(client_id, seq)
+
+        def compute():
+            if use_roi:
+                # Only the region (plus the method's border) is processed
+                result = apply_method_roi(processor, img, method, kwargs, rect=rect, mask=mask, feather=feather)
+            # Reuse cached intensity statistics instead of recomputing them
+            elif method in STATS_METHODS:
+                result = apply_method(processor, img, method, dict(kwargs, stats=stats_cache.get(content_hash, img)))
+            else:
+                result = apply_method(processor, img, method, kwargs)
+            if specs is not None:
+                # Every size comes from this one processed result
+                return derivatives_zip(result, specs, base_filename)
+            _, img_encoded = cv2.imencode('.png', result)
+            return img_encoded.tobytes()
+
+        # Progressive mode streams a low-resolution preview before the full result
+        if params.get('progressive', 'false').lower() == 'true' and specs is None:
+            # Fast methods and regions go straight to the final result
+            preview = preview_input(img) if method in SLOW_METHODS and not use_roi else None
+
+            def events():
+                try:
+                    if preview is not None:
+                        preview_result = apply_method(processor, preview, method, kwargs)
+                        yield sse_event('preview', {
+                            'image': encode_preview(preview_result),
+                            'width': preview_result.shape[1],
+                            'height': preview_result.shape[0],
+                        })
+                    try:
+                        png_bytes = coalescer.run(key, compute, client_id=client_id, seq=seq)
+                    except SupersededError:
+                        logger.debug(f"Dropping superseded request {seq} from client {client_id}")
+                        yield sse_event('superseded', {'superseded': True})
+                        return
+                    yield sse_event('final', {'image': data_url(png_bytes)})
+                except Exception as e:
+                    logger.exception("Error processing image")
+                    yield sse_event('error', {'error': str(e)})
+
+            return Response(stream_with_context(events()), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        try:
+            png_bytes = coalescer.run(key, compute, client_id=client_id, seq=seq)
+        except SupersededError:
+            logger.debug(f"Dropping superseded request {seq} from client {client_id}")
+            return jsonify({"error": "Request superseded", "superseded": True}), 409
+
+        if specs is not None:
+            return send_file(BytesIO(png_bytes), mimetype='application/zip', as_attachment=True,
+                             download_name=f"{base_filename}.zip")
+
         # Return processed image
-        img_buffer = BytesIO()
-        _, img_encoded = cv2.imencode('.png', result)
-        img_buffer.write(img_encoded)
-        img_buffer.seek(0)
-        
-        return send_file(img_buffer, mimetype='image/png')
+        return send_file(BytesIO(png_bytes), mimetype='image/png')
         
     except Exception as e:
         logger.exception("Error processing image")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/image-stats', methods=['POST'])
+def image_stats():
+    """Return per-channel and luma histograms, min/max, mean and percentiles of an image"""
+    try:
+        # Check if image file is present in request
+        if 'image' not in request.files:
+            logger.error("No image file in request")
+            return jsonify({"error": "No image file"}), 400
+        
+        file_bytes = request.files['image'].read()
+        content_hash = hashlib.sha1(file_bytes).hexdigest()
+        
+        # Only decode the image if its statistics are not cached yet
+        stats = stats_cache.lookup(content_hash)
+        if stats is None:
+            img = load_upload(file_bytes, content_hash)
+            if img is None:
+                logger.error("Failed to decode image")
+                return jsonify({"error": "Invalid image format"}), 400
+            stats = stats_cache.get(content_hash, img)
+        
+        return jsonify(stats.to_dict())
+        
+    except Exception as e:
+        logger.exception("Error computing image statistics")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/point-lut', methods=['POST'])
+def point_lut():
+    """Return the per-channel lookup table of a point operation (or pipeline of them)"""
+    try:
+        params = request.form.to_dict()
+        try:
+            steps = parse_steps(params)
+        except ValueError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 400
+        
+        # Image-dependent tables (log transformation) need the image's statistics
+        stats = None
+        if any(method in IMAGE_DEPENDENT_METHODS for method, _ in steps):
+            if 'image' not in request.files:
+                return jsonify({"error": "This method needs the image to build its table"}), 400
+            file_bytes = request.files['image'].read()
+            content_hash = hashlib.sha1(file_bytes).hexdigest()
+            stats = stats_cache.lookup(content_hash)
+            if stats is None:
+                img = load_upload(file_bytes, content_hash)
+                if img is None:
+                    logger.error("Failed to decode image")
+                    return jsonify({"error": "Invalid image format"}), 400
+                stats = stats_cache.get(content_hash, img)
+        
+        try:
+            lut, grayscale = compose_point_luts(processor, steps, stats)
+        except ValueError as e:
+            # Not expressible as a table; the client falls back to /enhance
+            return jsonify({"error": str(e), "fallback": True}), 422
+        
+        return jsonify({
+            'grayscale': grayscale,
+            'lut': {name: lut[i].tolist() for i, name in enumerate(('b', 'g', 'r'))}
+        })
+        
+    except Exception as e:
+        logger.exception("Error building lookup table")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/history', methods=['POST'])
+def create_history():
+    """Start a server-side edit history for an uploaded image"""
+    try:
+        # Check if image file is present in request
+        if 'image' not in request.files:
+            logger.error("No image file in request")
+            return jsonify({"error": "No image file"}), 400
+
+        file_bytes = request.files['image'].read()
+        img = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            logger.error("Failed to decode image")
+            return jsonify({"error": "Invalid image format"}), 400
+
+        history = history_store.create(img, hashlib.sha1(file_bytes).hexdigest())
+        logger.debug(f"Created edit history {history.history_id}")
+        return jsonify(history.to_dict())
+
+    except Exception as e:
+        logger.exception("Error creating edit history")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/history/<history_id>', methods=['GET'])
+def get_history(history_id):
+    """Return the steps and cursor position of an edit history"""
+    try:
+        return jsonify(history_store.get(history_id).to_dict())
+    except KeyError:
+        return jsonify({"error": "Unknown edit history"}), 404
+
+def history_response(history, png_bytes):
+    """Send a history state as PNG with its cursor position in the headers"""
+    response = send_file(BytesIO(png_bytes), mimetype='image/png')
+    response.headers['X-History-Cursor'] = str(history.cursor)
+    response.headers['X-History-Steps'] = str(len(history.path) - 1)
+    return response
+
+@app.route('/history/<history_id>/image', methods=['GET'])
+def get_history_image(history_id):
+    """Return the image at the current state of an edit history"""
+    try:
+        return history_response(*history_store.current(history_id))
+    except KeyError:
+        return jsonify({"error": "Unknown edit history"}), 404
+    except Exception as e:
+        logger.exception("Error reading edit history")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/history/<history_id>/<action>', methods=['POST'])
+@app.route('/history/<history_id>/<action>/<int:index>', methods=['POST'])
+def update_history(history_id, action, index=None):
+    """
+    Apply, edit, undo or redo a step and return the resulting image
+
+    State-changing actions only accept POST, so links, prefetchers and
+    crawlers cannot trigger them.
+
+    Actions:
+        apply: append a 'method' (with its parameters) or a 'pipeline' after the current state
+        edit/<index>: replace step <index> with 'method' and recompute the steps after it
+        undo, redo: move through the history
+    """
+    try:
+        params = request.form.to_dict()
+        if action == 'apply':
+            history, png_bytes = history_store.apply(history_id, parse_steps(params))
+        elif action == 'edit' and index is not None:
+            (method, kwargs), = parse_steps({k: v for k, v in params.items() if k != 'pipeline'})
+            history, png_bytes = history_store.edit(history_id, index, method, kwargs)
+        elif action == 'undo':
+            history, png_bytes = history_store.undo(history_id)
+        elif action == 'redo':
+            history, png_bytes = history_store.redo(history_id)
+        else:
+            return jsonify({"error": f"Unknown history action: {action}"}), 404
+        return history_response(history, png_bytes)
+
+    except KeyError:
+        return jsonify({"error": "Unknown edit history"}), 404
+    except ValueError as e:
+        logger.error(str(e))
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error updating edit history")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/batch-enhance', methods=['POST'])
 def batch_enhance():
     """Process multiple images using the same enhancement method"""
@@ -183,6 +436,16 @@ def batch_enhance():
         method = request.form.get('method', '')
         logger.debug(f"Batch enhancement method requested: {method}")
         
+        # Validate method and parameters once for the whole batch
+        params = request.form.to_dict()
+        try:
+            kwargs = parse_method_params(method, params)
+            if method not in METHOD_FUNCTIONS:
+                raise ValueError(f"Unknown enhancement method: {method}")
+        except ValueError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 400
+        
         # Create a unique session directory for this batch
         session_id = str(uuid.uuid4())
         session_dir = os.path.join(TEMP_DIR, session_id)
@@ -194,7 +457,8 @@ def batch_enhance():
         # Track processed files
         processed_files = []
         
-        # Process each image
+        # Decode all images first so equally-sized ones can be processed together
+        decoded = []
         for i, file in enumerate(files):
             # Validate file
             if file.filename == '':
@@ -212,100 +476,57 @@ def batch_enhance():
                 logger.warning(f"Error decoding image {file.filename}: {str(e)}, skipping")
                 continue
             
-            # Get parameters and apply enhancement
-            params = request.form.to_dict()
-            
+            decoded.append((file.filename, img))
+        
+        # Point operations over same-shaped images run as one vectorized call
+        images = [img for _, img in decoded]
+        batch_results = None
+        if len(images) > 1 and batch_processor.can_vectorize(images, method):
             try:
-                # Apply the same enhancement as in the 'enhance' route
-                if method == 'histogram_equalization':
-                    result = processor.histogram_equalization(img)
-                elif method == 'gamma_correction':
-                    gamma = float(params.get('gamma', 1.0))
-                    result = processor.gamma_correction(img, gamma)
-                elif method == 'unsharp_mask':
-                    amount = float(params.get('amount', 1.0))
-                    radius = int(params.get('radius', 5))
-                    result = processor.unsharp_mask(img, kernel_size=(radius, radius), amount=amount)
-                elif method == 'gaussian_blur':
-                    radius = int(params.get('radius', 5))
-                    result = processor.gaussian_blur(img, radius)
-                elif method == 'edge_detection':
-                    detection_method = params.get('detection_method', 'sobel')
-                    threshold1 = int(params.get('threshold1', 100))
-                    threshold2 = int(params.get('threshold2', 200))
-                    result = processor.edge_detection(img, method=detection_method, threshold1=threshold1, threshold2=threshold2)
-                elif method == 'super_resolution':
-                    scale_factor = int(params.get('scale_factor', 2))
-                    result = processor.super_resolution(img, scale_factor=scale_factor)
-                elif method == 'color_balance':
-                    r_factor = float(params.get('r_factor', 1.0))
-                    g_factor = float(params.get('g_factor', 1.0))
-                    b_factor = float(params.get('b_factor', 1.0))
-                    result = processor.color_balance(img, r_factor=r_factor, g_factor=g_factor, b_factor=b_factor)
-                elif method == 'sepia_filter':
-                    intensity = float(params.get('intensity', 0.5))
-                    result = processor.sepia_filter(img, intensity=intensity)
-                elif method == 'noise_reduction':
-                    strength = int(params.get('strength', 7))
-                    result = processor.noise_reduction(img, strength=strength)
-                elif method == 'sharpen':
-                    strength = float(params.get('strength', 1.0))
-                    result = processor.sharpen(img, strength=strength)
-                # Medical image processing methods
-                elif method == 'clahe_enhance':
-                    clip_limit = float(params.get('clip_limit', 2.0))
-                    grid_size = int(params.get('grid_size', 8))
-                    result = processor.clahe_enhance(img, clip_limit=clip_limit, grid_size=grid_size)
-                elif method == 'dicom_window':
-                    window_width = int(params.get('window_width', 400))
-                    window_level = int(params.get('window_level', 50))
-                    result = processor.dicom_window(img, window_width=window_width, window_level=window_level)
-                elif method == 'enhance_vessels':
-                    strength = float(params.get('strength', 1.5))
-                    result = processor.enhance_vessels(img, strength=strength)
-                elif method == 'bit_plane_slicing':
-                    bit_plane = int(params.get('bit_plane', 7))
-                    result = processor.bit_plane_slicing(img, bit_plane=bit_plane)
-                elif method == 'log_transformation':
-                    c = float(params.get('c', 1.0))
-                    result = processor.log_transformation(img, c=c)
-                elif method == 'gray_level_slicing':
-                    min_val = int(params.get('min_val', 100))
-                    max_val = int(params.get('max_val', 200))
-                    highlight_only = params.get('highlight_only', 'false').lower() == 'true'
-                    result = processor.gray_level_slicing(img, min_val=min_val, max_val=max_val, highlight_only=highlight_only)
-                elif method == 'piecewise_linear':
-                    # Parse points from JSON string
-                    points_str = params.get('points', '[[0,0],[128,128],[255,255]]')
-                    try:
-                        points = json.loads(points_str)
-                        # Validate points
-                        if not points or not all(isinstance(p, list) and len(p) == 2 for p in points):
-                            raise ValueError("Invalid points format")
-                    except (json.JSONDecodeError, ValueError) as e:
-                        logger.error(f"Invalid points format: {e}")
-                        # Default to identity transform
-                        points = [[0, 0], [128, 128], [255, 255]]
-                        
-                    result = processor.piecewise_linear_transform(img, points)
-                else:
-                    logger.error(f"Unknown method: {method}")
-                    return jsonify({"error": f"Unknown enhancement method: {method}"}), 400
-                
-                # Save processed image
-                img_format = params.get('format', 'png')
-                if img_format == 'jpg' or img_format == 'jpeg':
-                    ext = '.jpg'
-                    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), int(float(params.get('quality', 0.9)) * 100)]
-                elif img_format == 'webp':
-                    ext = '.webp'
-                    encode_param = [int(cv2.IMWRITE_WEBP_QUALITY), int(float(params.get('quality', 0.9)) * 100)]
+                logger.debug(f"Applying {method} to a stacked batch of {len(images)} images")
+                batch_results = batch_processor.process(images, method, kwargs)
+            except Exception:
+                logger.exception("Vectorized batch failed, falling back to per-image processing")
+        
+        # Output encoding is the same for every image
+        ext, encode_param = output_encoding(params.get('format', 'png'), params.get('quality', 0.9))
+        
+        # Optional list of output sizes/formats written for every image
+        specs = None
+        if params.get('outputs'):
+            try:
+                specs = parse_outputs(params['outputs'])
+            except ValueError as e:
+                logger.error(str(e))
+                shutil.rmtree(session_dir, ignore_errors=True)
+                return jsonify({"error": str(e)}), 400
+        
+        # Process (if not already batched) and save each image
+        for i, (filename, img) in enumerate(decoded):
+            try:
+                if batch_results is not None:
+                    result = batch_results[i]
                 else:
-                    ext = '.png'
-                    encode_param = []
+                    # Apply the same enhancement as in the 'enhance' route
+                    result = apply_method(processor, img, method, kwargs)
                 
                 # Get original filename without extension and add new extension
-                base_filename = os.path.splitext(file.filename)[0]
+                base_filename = os.path.splitext(filename)[0]
+                
+                if specs is not None:
+                    # Resize and encode every requested size from the one processed result
+                    for suffix, data in encode_derivatives(build_derivatives(result, specs), specs):
+                        output_filename = f"{base_filename}_enhanced{suffix}"
+                        output_path = os.path.join(session_dir, output_filename)
+                        with open(output_path, 'wb') as f:
+                            f.write(data)
+                        processed_files.append({
+                            'original': filename,
+                            'processed': output_filename,
+                            'path': output_path
+                        })
+                    continue
+                
                 output_filename = f"{base_filename}_enhanced{ext}"
                 output_path = os.path.join(session_dir, output_filename)
                 
@@ -316,13 +537,13 @@ def batch_enhance():
                     cv2.imwrite(output_path, result)
                 
                 processed_files.append({
-                    'original': file.filename,
+                    'original': filename,
                     'processed': output_filename,
                     'path': output_path
                 })
                 
             except Exception as e:
-                logger.exception(f"Error processing image {file.filename}")
+                logger.exception(f"Error processing image {filename}")
                 continue
         
         # Check if any files were processed
@@ -333,10 +554,13 @@ def batch_enhance():
         # Store processed files info in session
         session['processed_files'] = processed_files
         
+        # Each image produced one file per requested output
+        count = len(processed_files) // len(specs) if specs is not None else len(processed_files)
         return jsonify({
-            "message": f"Successfully processed {len(processed_files)} images",
+            "message": f"Successfully processed {count} images",
             "session_id": session_id,
-            "count": len(processed_files)
+            "count": count,
+            "files": len(processed_files)
         })
         
     except Exception as e:
@@ -344,6 +568,65 @@ def batch_enhance():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/enhance-video', methods=['POST'])
+def enhance_video():
+    """Process every frame of a video or animated image with a method or pipeline"""
+    try:
+        logger.debug("Received video enhancement request")
+        
+        # Check if video file is present in request
+        if 'video' not in request.files:
+            logger.error("No video file in request")
+            return jsonify({"error": "No video file"}), 400
+        
+        file = request.files['video']
+        if file.filename == '':
+            logger.error("Empty filename")
+            return jsonify({"error": "No selected file"}), 400
+        
+        # Validate the method or pipeline before touching the upload
+        params = request.form.to_dict()
+        try:
+            steps = parse_steps(params)
+        except ValueError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 400
+        
+        # OpenCV decodes from a path, so spool the upload to the temp directory
+        job_id = str(uuid.uuid4())
+        input_ext = os.path.splitext(file.filename)[1] or '.mp4'
+        input_path = os.path.join(TEMP_DIR, f"{job_id}_input{input_ext}")
+        output_path = os.path.join(TEMP_DIR, f"{job_id}_enhanced.mp4")
+        file.save(input_path)
+        
+        try:
+            stats = video_processor.process_file(input_path, output_path, steps)
+            
+            # Load the result so both temp files can be removed before responding
+            with open(output_path, 'rb') as f:
+                video_buffer = BytesIO(f.read())
+        except ValueError as e:
+            logger.error(f"Video processing failed: {e}")
+            return jsonify({"error": str(e)}), 400
+        finally:
+            for path in (input_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        base_filename = os.path.splitext(file.filename)[0]
+        response = send_file(video_buffer, mimetype='video/mp4', as_attachment=True,
+                             download_name=f"{base_filename}_enhanced.mp4")
+        
+        # Report throughput alongside the video
+        response.headers['X-Frames'] = str(stats['frames'])
+        response.headers['X-Frames-Per-Second'] = str(stats['fps'])
+        return response
+        
+    except Exception as e:
+        logger.exception("Error processing video")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/download-zip', methods=['GET'])
 def download_zip():
     """Download all processed images as a ZIP file"""
@@ -0,0 +1,110 @@
+import numpy as np
+from backend.image_processor import ImageProcessor
+from backend.methods import METHOD_FUNCTIONS, apply_method
+
+class BatchProcessor:
+    """Apply one enhancement method to a batch of equally-sized images"""
+
+    # Methods whose output pixel depends only on the input pixel and the parameters,
+    # so a whole N x H x W x C batch can be processed as one tall image
+    POINT_METHODS = frozenset([
+        'gamma_correction',
+        'color_balance',
+        'sepia_filter',
+        'gray_level_slicing',
+        'bit_plane_slicing',
+        'piecewise_linear',
+    ])
+
+    def __init__(self, processor=None):
+        self.processor = processor or ImageProcessor()
+
+    @staticmethod
+    def stack(images):
+        """
+        Stack equally-shaped images into a single 4D array
+
+        Args:
+            images: Sequence of images (H x W x C or H x W)
+
+        Returns:
+            N x H x W (x C) uint8 array, or None if shapes or dtypes differ
+        """
+        if len(images) == 0:
+            return None
+        first = images[0]
+        if any(img.shape != first.shape or img.dtype != first.dtype for img in images):
+            return None
+        return np.stack(images)
+
+    def can_vectorize(self, images, method):
+        """
+        Check whether a batch can be processed in a single vectorized call
+
+        Args:
+            images: Sequence of images or a 4D array
+            method: Enhancement method name
+
+        Returns:
+            True if the method is a point operation and all shapes match
+        """
+        if method not in self.POINT_METHODS:
+            return False
+        if isinstance(images, np.ndarray):
+            return images.ndim >= 3
+        return len(images) > 0 and all(img.shape == images[0].shape for img in images)
+
+    def process(self, images, method, kwargs, inplace=False):
+        """
+        Apply a method to every image of a batch
+
+        Point operations run once over the whole stacked batch; spatial
+        filters fall back to a per-image loop writing into one output array.
+
+        Args:
+            images: N x H x W (x C) array, or a sequence of images
+            method: Enhancement method name
+            kwargs: Keyword arguments from parse_method_params
+            inplace: If True and images is an array, overwrite it with the result
+
+        Returns:
+            N x H' x W' (x C) array if the images share a shape, otherwise a list of results
+        """
+        if method not in METHOD_FUNCTIONS:
+            raise ValueError(f"Unknown enhancement method: {method}")
+
+        if isinstance(images, np.ndarray):
+            batch = np.ascontiguousarray(images)
+            # A contiguous copy is ours to overwrite; the caller's array only when asked
+            inplace = inplace or batch is not images
+        else:
+            batch = self.stack(images)
+            inplace = True
+            if batch is None:
+                # Mixed shapes: process each image on its own
+                return [apply_method(self.processor, img, method, kwargs) for img in images]
+
+        n, h, w = batch.shape[:3]
+        if n == 0:
+            return batch
+
+        if method in self.POINT_METHODS:
+            # View the batch as one (N*H) x W image and process it in a single call
+            flat = batch.reshape((n * h, w) + batch.shape[3:])
+            result = apply_method(self.processor, flat, method, dict(kwargs, inplace=inplace))
+            return result.reshape((n, h) + result.shape[1:])
+
+        # Spatial filters: the first result fixes the output shape, the rest are written in place
+        first = apply_method(self.processor, batch[0], method, kwargs)
+        if inplace and first.shape == batch.shape[1:]:
+            out = batch
+        else:
+            out = np.empty((n,) + first.shape, dtype=first.dtype)
+        out[0] = first
+        for i in range(1, n):
+            if out is batch:
+                # Use inplace so methods that cannot alias their input copy back safely
+                apply_method(self.processor, batch[i], method, dict(kwargs, inplace=True))
+            else:
+                apply_method(self.processor, batch[i], method, dict(kwargs, out=out[i]))
+        return out
@@ -0,0 +1,291 @@
+"""
+Command-line bulk processor for image directories
+
+Applies an ImageProcessor method or pipeline to every image under a
+directory tree without starting Flask, e.g.:
+
+    python -m backend.cli photos/ enhanced/ --method gamma_correction --param gamma=2.2
+    python -m backend.cli scans/ out/ --pipeline '[{"method": "clahe_enhance"}, {"method": "sharpen"}]'
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+from backend.image_processor import ImageProcessor
+from backend.methods import parse_steps, apply_pipeline, output_encoding
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+MANIFEST_NAME = '.picwizard-manifest.json'
+
+# Save progress this often so an interrupted run can resume
+MANIFEST_FLUSH_INTERVAL = 50
+
+# Per-process ImageProcessor, created once by the pool initializer
+_processor = None
+
+
+def _init_worker():
+    global _processor
+    _processor = ImageProcessor()
+
+
+def file_hash(path):
+    """
+    Compute the SHA-1 of a file's contents
+
+    Args:
+        path: File path
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_images(input_dir, exclude_dir=None):
+    """
+    Walk a directory tree for image files
+
+    Args:
+        input_dir: Root directory to search
+        exclude_dir: Directory to skip (e.g. an output directory nested in the input)
+
+    Returns:
+        Sorted list of paths relative to input_dir
+    """
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude_dir]
+        for name in files:
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                found.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return sorted(found)
+
+
+def output_names(rel_paths, ext):
+    """
+    Choose an output path for every input image
+
+    Outputs are named <name>_enhanced<ext>. Inputs that share a name in the
+    same directory (e.g. x.png and x.jpg) keep their source extension in the
+    name instead (x_png_enhanced<ext>, x_jpg_enhanced<ext>).
+
+    Args:
+        rel_paths: Input paths relative to the input directory
+        ext: Output file extension
+
+    Returns:
+        Dict mapping each input path to its output path (relative to the output directory)
+
+    Raises:
+        ValueError: If two inputs would still be written to the same file
+    """
+    stems = Counter(os.path.normcase(os.path.splitext(rel_path)[0]) for rel_path in rel_paths)
+    outputs = {}
+    for rel_path in rel_paths:
+        stem, source_ext = os.path.splitext(rel_path)
+        if stems[os.path.normcase(stem)] > 1:
+            stem += '_' + source_ext[1:]
+        outputs[rel_path] = stem + '_enhanced' + ext
+
+    owners = {}
+    for rel_path, output in outputs.items():
+        other = owners.setdefault(os.path.normcase(output), rel_path)
+        if other != rel_path:
+            raise ValueError(f"{other} and {rel_path} would both be written to {output}")
+    return outputs
+
+
+def process_image(input_path, output_path, steps, encode_param):
+    """
+    Process one image file (runs in a worker process)
+
+    Args:
+        input_path: Source image path
+        output_path: Destination image path
+        steps: List of (method, kwargs) tuples
+        encode_param: OpenCV encode parameters for the output format
+
+    Returns:
+        Tuple of (input SHA-1, number of input pixels)
+    """
+    img = cv2.imread(input_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Failed to decode image")
+    result = apply_pipeline(_processor, img, steps)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if not cv2.imwrite(output_path, result, encode_param):
+        raise ValueError("Failed to write output")
+    return file_hash(input_path), img.shape[0] * img.shape[1]
+
+
+def load_manifest(path):
+    """
+    Load the record of previously processed files
+
+    Args:
+        path: Manifest file path
+
+    Returns:
+        Dict mapping relative input paths to their last processing record
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    """
+    Atomically write the record of processed files
+
+    Args:
+        path: Manifest file path
+        manifest: Dict mapping relative input paths to processing records
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(input_path, output_path, record, settings):
+    """
+    Check whether an output can be reused instead of reprocessing
+
+    The output must exist and have been produced with the same settings;
+    the input must either be older than the output or have the recorded hash.
+
+    Args:
+        input_path: Source image path
+        output_path: Destination image path
+        record: Manifest entry for this input (or None)
+        settings: Settings key of the current run
+
+    Returns:
+        True if the image can be skipped
+    """
+    if record is None or record.get('settings') != settings or not os.path.exists(output_path):
+        return False
+    if os.path.getmtime(input_path) <= os.path.getmtime(output_path):
+        return True
+    # Touched but possibly unchanged: fall back to the content hash
+    return file_hash(input_path) == record.get('sha1')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='picwizard',
+        description='Apply a PicWizard enhancement method or pipeline to every image in a directory tree.')
+    parser.add_argument('input_dir', help='Directory to read images from (searched recursively)')
+    parser.add_argument('output_dir', help='Directory to write enhanced images to (mirrors input layout)')
+    parser.add_argument('--method', help='Enhancement method name, as used by /batch-enhance')
+    parser.add_argument('--param', action='append', default=[], metavar='KEY=VALUE',
+                        help='Method parameter, as used by /batch-enhance (repeatable)')
+    parser.add_argument('--pipeline', help='JSON list of {"method": ..., "params": {...}} steps')
+    parser.add_argument('--format', default='png', choices=['png', 'jpg', 'jpeg', 'webp'],
+                        help='Output format (default: png)')
+    parser.add_argument('--quality', type=float, default=0.9, help='Lossy output quality 0-1 (default: 0.9)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Reprocess images even if outputs are up to date')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # Build the same parameter dict /batch-enhance receives from its form
+    params = {}
+    for item in args.param:
+        key, sep, value = item.partition('=')
+        if not sep:
+            parser.error(f"--param expects KEY=VALUE, got {item!r}")
+        params[key] = value
+    if args.method:
+        params['method'] = args.method
+    if args.pipeline:
+        params['pipeline'] = args.pipeline
+    if not args.method and not args.pipeline:
+        parser.error("one of --method or --pipeline is required")
+    try:
+        steps = parse_steps(params)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"input directory not found: {args.input_dir}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    ext, encode_param = output_encoding(args.format, args.quality)
+    settings = json.dumps({'steps': steps, 'format': ext, 'encode': encode_param}, sort_keys=True, default=list)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    # Decide which images need work
+    todo = []
+    skipped = 0
+    try:
+        outputs = output_names(find_images(args.input_dir, exclude_dir=args.output_dir), ext)
+    except ValueError as e:
+        parser.error(str(e))
+    for rel_path, output_name in outputs.items():
+        input_path = os.path.join(args.input_dir, rel_path)
+        output_path = os.path.join(args.output_dir, output_name)
+        if not args.force and is_up_to_date(input_path, output_path, manifest.get(rel_path), settings):
+            skipped += 1
+            continue
+        todo.append((rel_path, input_path, output_path))
+
+    print(f"Found {len(todo) + skipped} images: {len(todo)} to process, {skipped} up to date")
+
+    processed = failed = 0
+    pixels = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(process_image, input_path, output_path, steps, encode_param): rel_path
+                for rel_path, input_path, output_path in todo
+            }
+            for future in as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    sha1, count = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"  failed: {rel_path}: {e}", file=sys.stderr)
+                    continue
+                processed += 1
+                pixels += count
+                manifest[rel_path] = {'sha1': sha1, 'settings': settings}
+                if processed % MANIFEST_FLUSH_INTERVAL == 0:
+                    save_manifest(manifest_path, manifest)
+                    elapsed = time.perf_counter() - start
+                    print(f"  {processed}/{len(todo)} done ({processed / elapsed:.1f} images/s)")
+    finally:
+        save_manifest(manifest_path, manifest)
+
+    # Summary
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    megapixels = pixels / 1e6 / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {processed}, skipped {skipped}, failed {failed} in {elapsed:.2f}s "
+          f"({rate:.1f} images/s, {megapixels:.1f} MP/s)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
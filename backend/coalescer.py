@@ -0,0 +1,123 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SupersededError(Exception):
+    """Raised when a queued request was replaced by a newer one from the same client"""
+
+
+class _Flight:
+    """A single in-flight computation that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """Single-flight deduplication for identical enhancement requests"""
+
+    def __init__(self, max_concurrent=None, max_clients=1024):
+        """
+        Args:
+            max_concurrent: Maximum number of computations running at once
+                            (defaults to the number of CPUs)
+            max_clients: Number of clients whose latest sequence number is
+                         remembered (least recently seen clients are forgotten)
+        """
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._latest_seq = OrderedDict()
+        self.max_clients = max_clients
+        self._slots = threading.BoundedSemaphore(max_concurrent or os.cpu_count() or 1)
+
+    def register(self, client_id, seq):
+        """
+        Record the newest request sequence number seen from a client
+
+        Args:
+            client_id: Opaque client identifier (e.g. one browser tab)
+            seq: Monotonically increasing request number from that client
+        """
+        if not client_id or seq is None:
+            return
+        with self._lock:
+            if seq > self._latest_seq.get(client_id, -1):
+                self._latest_seq[client_id] = seq
+            self._latest_seq.move_to_end(client_id)
+            # A forgotten client only loses supersession checks for its queued requests
+            while len(self._latest_seq) > self.max_clients:
+                self._latest_seq.popitem(last=False)
+
+    def is_superseded(self, client_id, seq):
+        """
+        Check whether a newer request from the same client has arrived
+
+        Args:
+            client_id: Opaque client identifier
+            seq: Sequence number of the request being checked
+
+        Returns:
+            True if the request is stale
+        """
+        if not client_id or seq is None:
+            return False
+        with self._lock:
+            return self._latest_seq.get(client_id, -1) > seq
+
+    def run(self, key, func, client_id=None, seq=None):
+        """
+        Run func once per key; concurrent callers with the same key share the result
+
+        Args:
+            key: Hashable key identifying the computation (content hash + params)
+            func: Zero-argument callable producing the result
+            client_id: Optional client identifier for supersession checks
+            seq: Optional request sequence number for supersession checks
+
+        Returns:
+            Result of func (possibly computed by another caller)
+
+        Raises:
+            SupersededError: If the request became stale before it started
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                leader = True
+
+        if not leader:
+            logger.debug(f"Coalescing request onto in-flight computation {key[:16]}")
+            flight.done.wait()
+            if isinstance(flight.error, SupersededError):
+                # The leader was dropped as stale, which says nothing about this caller
+                return self.run(key, func, client_id, seq)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            # Wait for a compute slot, then drop the work if it went stale meanwhile
+            with self._slots:
+                if self.is_superseded(client_id, seq) and flight.waiters == 0:
+                    raise SupersededError(f"Request {seq} from {client_id} was superseded")
+                flight.result = func()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
@@ -0,0 +1,223 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class Denoiser:
+    """Noise reduction with selectable speed/quality tiers"""
+
+    # Tiers ordered from fastest/lowest quality to slowest/highest quality
+    TIERS = ('fast', 'luma', 'reduced', 'full')
+
+    # Initial single-core cost estimates (seconds per megapixel at strength 7),
+    # refined at runtime from observed timings
+    DEFAULT_SECONDS_PER_MEGAPIXEL = {
+        'fast': 0.12,
+        'luma': 1.3,
+        'reduced': 1.3,
+        'full': 3.2,
+    }
+
+    # (template window, search window) for the Non-Local Means tiers
+    NLM_WINDOWS = {
+        'luma': (7, 21),
+        'reduced': (7, 11),
+        'full': (7, 21),
+    }
+
+    DEFAULT_LATENCY_BUDGET = 2.0
+
+    def __init__(self, workers=None, tile_min_pixels=1000000):
+        """
+        Args:
+            workers: Number of tiles processed in parallel (defaults to the number of CPUs)
+            tile_min_pixels: Images smaller than this are processed as a single tile
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_min_pixels = tile_min_pixels
+        self.seconds_per_megapixel = dict(self.DEFAULT_SECONDS_PER_MEGAPIXEL)
+        self._lock = threading.Lock()
+
+    def choose_tier(self, img, latency_budget=None):
+        """
+        Pick the highest-quality tier expected to finish within a latency budget
+
+        Args:
+            img: Input image
+            latency_budget: Time budget in seconds
+
+        Returns:
+            Tier name (the fastest tier if none fits)
+        """
+        if latency_budget is None:
+            latency_budget = self.DEFAULT_LATENCY_BUDGET
+        for tier in reversed(self.TIERS):
+            if self.estimate_seconds(img, tier) <= latency_budget:
+                return tier
+        return self.TIERS[0]
+
+    def estimate_seconds(self, img, tier):
+        """
+        Estimate how long a tier would take on an image
+
+        Args:
+            img: Input image
+            tier: Tier name
+
+        Returns:
+            Estimated seconds
+        """
+        pixels = img.shape[0] * img.shape[1]
+        parallelism = self.workers if self._use_tiles(img, tier) else 1
+        return self.seconds_per_megapixel[tier] * pixels / 1e6 / parallelism
+
+    def denoise(self, img, strength=7, tier='full', latency_budget=None, out=None):
+        """
+        Reduce noise using the requested tier
+
+        Args:
+            img: Input image (BGR format)
+            strength: Strength of noise reduction (higher values = more smoothing)
+            tier: 'fast', 'luma', 'reduced', 'full' or 'auto'
+            latency_budget: Time budget in seconds used by the 'auto' tier
+            out: Optional preallocated output array (may be img itself)
+
+        Returns:
+            Denoised image
+        """
+        if tier == 'auto':
+            tier = self.choose_tier(img, latency_budget)
+            logger.debug(f"Auto-selected denoising tier '{tier}' for {img.shape[1]}x{img.shape[0]}")
+        elif tier not in self.TIERS:
+            raise ValueError(f"Unknown denoising tier: {tier}")
+
+        func = getattr(self, f'_denoise_{tier}')
+        start = time.perf_counter()
+
+        # Tiles and Non-Local Means read neighbouring pixels, so never write over the input
+        target = np.empty_like(img) if out is None or out is img else out
+        if self._use_tiles(img, tier):
+            self._tiled(func, img, strength, self._border(tier), target)
+        else:
+            func(img, strength, target)
+
+        self._record(tier, img, time.perf_counter() - start)
+        if out is img:
+            np.copyto(img, target)
+            return img
+        return target
+
+    def _use_tiles(self, img, tier):
+        return tier != 'fast' and self.workers > 1 and img.shape[0] * img.shape[1] >= self.tile_min_pixels
+
+    def _border(self, tier):
+        # Pixels beyond a tile edge that influence it: half the search plus half the template window
+        if tier == 'fast':
+            return 0
+        template, search = self.NLM_WINDOWS[tier]
+        return search // 2 + template // 2 + 2
+
+    def _tiled(self, func, img, strength, border, dst):
+        """
+        Process horizontal strips in parallel, each padded with overlap rows
+
+        Args:
+            func: Tier function taking (tile, strength, dst)
+            img: Input image
+            strength: Denoising strength
+            border: Overlap rows added above and below each strip
+            dst: Output array
+        """
+        height = img.shape[0]
+        bounds = [height * i // self.workers for i in range(self.workers + 1)]
+
+        def run(i):
+            y0, y1 = bounds[i], bounds[i + 1]
+            top, bottom = max(0, y0 - border), min(height, y1 + border)
+            result = func(img[top:bottom], strength, None)
+            dst[y0:y1] = result[y0 - top:y1 - top]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(run, range(self.workers)))
+
+    def cost_snapshot(self):
+        """
+        Copy the current per-tier cost estimates
+
+        Returns:
+            Dict mapping tier names to seconds per megapixel
+        """
+        with self._lock:
+            return dict(self.seconds_per_megapixel)
+
+    def restore_costs(self, snapshot, tiers):
+        """
+        Reset some tiers' cost estimates to earlier values, keeping the others
+
+        Args:
+            snapshot: Dict from cost_snapshot
+            tiers: Tier names to reset
+        """
+        with self._lock:
+            for tier in tiers:
+                self.seconds_per_megapixel[tier] = snapshot[tier]
+
+    def _record(self, tier, img, elapsed):
+        # Exponential moving average of the observed per-core cost
+        pixels = img.shape[0] * img.shape[1]
+        if pixels == 0:
+            return
+        parallelism = self.workers if self._use_tiles(img, tier) else 1
+        observed = elapsed * parallelism / (pixels / 1e6)
+        with self._lock:
+            self.seconds_per_megapixel[tier] = 0.8 * self.seconds_per_megapixel[tier] + 0.2 * observed
+
+    @staticmethod
+    def _denoise_fast(img, strength, dst):
+        # Edge-preserving bilateral filter; colour sigma scales with strength
+        return cv2.bilateralFilter(img, 7, strength * 5, 5, dst=dst)
+
+    def _denoise_luma(self, img, strength, dst):
+        # Non-Local Means on luma only; chroma is smoothed with a cheap Gaussian
+        template, search = self.NLM_WINDOWS['luma']
+        ycrcb = cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
+        y = cv2.extractChannel(ycrcb, 0)
+        cv2.insertChannel(cv2.fastNlMeansDenoising(y, None, strength, template, search), ycrcb, 0)
+        for channel in (1, 2):
+            chroma = cv2.extractChannel(ycrcb, channel)
+            cv2.GaussianBlur(chroma, (5, 5), 0, dst=chroma)
+            cv2.insertChannel(chroma, ycrcb, channel)
+        return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR, dst=dst)
+
+    def _denoise_reduced(self, img, strength, dst):
+        template, search = self.NLM_WINDOWS['reduced']
+        return cv2.fastNlMeansDenoisingColored(img, dst, strength, strength, template, search)
+
+    def _denoise_full(self, img, strength, dst):
+        template, search = self.NLM_WINDOWS['full']
+        return cv2.fastNlMeansDenoisingColored(img, dst, strength, strength, template, search)
+
+    def benchmark(self, clean, noisy, strength=7):
+        """
+        Measure time and quality of every tier on a reference image pair
+
+        Args:
+            clean: Noise-free reference image
+            noisy: Noisy version of the reference image
+            strength: Denoising strength
+
+        Returns:
+            List of dicts with tier, seconds and PSNR (dB) against the reference
+        """
+        rows = [{'tier': 'none', 'seconds': 0.0, 'psnr': cv2.PSNR(clean, noisy)}]
+        for tier in self.TIERS:
+            start = time.perf_counter()
+            result = self.denoise(noisy, strength, tier)
+            elapsed = time.perf_counter() - start
+            rows.append({'tier': tier, 'seconds': elapsed, 'psnr': cv2.PSNR(clean, result)})
+        return rows
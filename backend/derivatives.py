@@ -0,0 +1,144 @@
+import os
+import json
+import zipfile
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from backend.methods import output_encoding
+
+OUTPUT_FORMATS = ('png', 'jpg', 'jpeg', 'webp')
+
+
+def parse_outputs(outputs_str):
+    """
+    Parse a list of derivative output specifications
+
+    Each entry is an object with an optional 'size' (longest side in pixels;
+    omitted or 0 keeps the full-size master), 'format' ('png', 'jpg' or
+    'webp'), 'quality' (0-1, for lossy formats) and 'name'.
+
+    Args:
+        outputs_str: JSON list of output objects (or an already-decoded list)
+
+    Returns:
+        List of dicts with 'name', 'size', 'format' and 'quality'
+
+    Raises:
+        ValueError: If the list is malformed
+    """
+    try:
+        outputs = json.loads(outputs_str) if isinstance(outputs_str, str) else outputs_str
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid outputs JSON: {e}")
+    if not isinstance(outputs, list) or not outputs:
+        raise ValueError("Outputs must be a non-empty list of {size, format, quality} objects")
+
+    specs = []
+    names = set()
+    for output in outputs:
+        if not isinstance(output, dict):
+            raise ValueError("Each output must be an object")
+        try:
+            size = int(output.get('size') or 0)
+            quality = float(output.get('quality', 0.9))
+        except (TypeError, ValueError):
+            raise ValueError("Output size must be an integer and quality a number")
+        img_format = str(output.get('format', 'png')).lower()
+        if size < 0:
+            raise ValueError("Output size must not be negative")
+        if img_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {img_format}")
+
+        name = str(output.get('name') or (size or 'full'))
+        if name in names:
+            name = f"{name}_{img_format}"
+        if name in names or os.sep in name:
+            raise ValueError(f"Duplicate or invalid output name: {name}")
+        names.add(name)
+        specs.append({'name': name, 'size': size, 'format': img_format, 'quality': quality})
+    return specs
+
+
+def build_derivatives(img, specs):
+    """
+    Resize one processed image to every requested size
+
+    Sizes are produced largest first from a successive-halving pyramid: each
+    level halves the previous one with area averaging, and each derivative is
+    resized from the smallest level that is still at least as large, so no
+    resize reads more than four times the pixels it writes.
+
+    Args:
+        img: Full-size processed image
+        specs: Output specifications from parse_outputs
+
+    Returns:
+        List of images, in the same order as specs
+    """
+    height, width = img.shape[:2]
+    longest = max(height, width)
+    results = [None] * len(specs)
+
+    level = img
+    for i in sorted(range(len(specs)), key=lambda i: -(specs[i]['size'] or longest)):
+        size = specs[i]['size']
+        if not size or size >= longest:
+            # Never upscale: the master is returned as is
+            results[i] = img
+            continue
+
+        # Halve while the next level still covers the target
+        while max(level.shape[:2]) // 2 >= size:
+            level = cv2.resize(level, (level.shape[1] // 2, level.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+        scale = size / longest
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if (level.shape[1], level.shape[0]) == target:
+            results[i] = level
+        else:
+            results[i] = cv2.resize(level, target, interpolation=cv2.INTER_AREA)
+    return results
+
+
+def encode_derivatives(images, specs, workers=None):
+    """
+    Encode derivatives in parallel
+
+    Args:
+        images: Images from build_derivatives
+        specs: Output specifications from parse_outputs
+        workers: Number of encoding threads (defaults to the number of outputs)
+
+    Returns:
+        List of (file suffix, encoded bytes) tuples, in the same order as specs
+    """
+    def encode(i):
+        ext, encode_param = output_encoding(specs[i]['format'], specs[i]['quality'])
+        success, encoded = cv2.imencode(ext, images[i], encode_param)
+        if not success:
+            raise ValueError(f"Failed to encode output {specs[i]['name']}")
+        return f"_{specs[i]['name']}{ext}", encoded.tobytes()
+
+    with ThreadPoolExecutor(max_workers=workers or len(specs)) as pool:
+        return list(pool.map(encode, range(len(specs))))
+
+
+def derivatives_zip(img, specs, base_name='enhanced'):
+    """
+    Build, encode and package every derivative of a processed image
+
+    Args:
+        img: Full-size processed image
+        specs: Output specifications from parse_outputs
+        base_name: File name prefix inside the archive
+
+    Returns:
+        ZIP archive bytes
+    """
+    encoded = encode_derivatives(build_derivatives(img, specs), specs)
+    memory_file = BytesIO()
+    # Images are already compressed, so store them as is
+    with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_STORED) as zf:
+        for suffix, data in encoded:
+            zf.writestr(base_name + suffix, data)
+    return memory_file.getvalue()
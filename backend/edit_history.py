@@ -0,0 +1,282 @@
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from backend.methods import apply_method, params_key
+
+class _Node:
+    """A state in the edit graph: the result of applying one step to its parent state"""
+
+    __slots__ = ('key', 'parent', 'method', 'kwargs')
+
+    def __init__(self, key, parent, method, kwargs):
+        self.key = key
+        self.parent = parent
+        self.method = method
+        self.kwargs = kwargs
+
+
+class EditHistory:
+    """One user's path through the edit graph of an uploaded image"""
+
+    def __init__(self, history_id, root_key, root_png, shape):
+        self.history_id = history_id
+        self.root_key = root_key
+        self.root_png = root_png
+        self.shape = shape
+        self.nodes = {}
+        # path[i] is the key of the state after i steps; path[0] is the upload
+        self.path = [root_key]
+        self.cursor = 0
+        self.lock = threading.Lock()
+
+    @property
+    def steps(self):
+        """(method, kwargs) of every step on the path, including undone ones"""
+        return [(self.nodes[key].method, self.nodes[key].kwargs) for key in self.path[1:]]
+
+    def to_dict(self):
+        """
+        Convert the history to a JSON-serializable dict
+
+        Returns:
+            Dict with the history id, the steps on the path and the cursor position
+        """
+        return {
+            'history_id': self.history_id,
+            'steps': [{'method': method, 'params': kwargs} for method, kwargs in self.steps],
+            'cursor': self.cursor,
+        }
+
+
+class HistoryStore:
+    """
+    Server-side edit histories with compressed, evictable checkpoints
+
+    Every state in an edit graph is identified by a hash of its parent state
+    and its step, so revisiting a state (undo, redo, or setting a parameter
+    back to an earlier value) is a checkpoint lookup. Checkpoints are stored
+    as PNG bytes in an LRU limited to a byte budget; an evicted state is
+    recomputed from its nearest surviving ancestor.
+    """
+
+    def __init__(self, processor, memory_budget=256 * 1024 * 1024, max_histories=64, compression=1):
+        """
+        Args:
+            processor: ImageProcessor used to apply steps
+            memory_budget: Maximum total size in bytes of the cached checkpoints
+            max_histories: Maximum number of histories kept (least recently used are dropped)
+            compression: PNG compression level of the checkpoints (0-9)
+        """
+        self.processor = processor
+        self.memory_budget = memory_budget
+        self.max_histories = max_histories
+        self.encode_param = [int(cv2.IMWRITE_PNG_COMPRESSION), compression]
+        self._histories = OrderedDict()
+        self._checkpoints = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def create(self, img, content_hash):
+        """
+        Start a new edit history for an uploaded image
+
+        Args:
+            img: Decoded image
+            content_hash: Hash of the uploaded file, used to share checkpoints between histories
+
+        Returns:
+            EditHistory instance
+        """
+        history = EditHistory(uuid.uuid4().hex, 'root:' + content_hash, self._encode(img), img.shape)
+        with self._lock:
+            self._histories[history.history_id] = history
+            while len(self._histories) > self.max_histories:
+                self._histories.popitem(last=False)
+        return history
+
+    def get(self, history_id):
+        """
+        Look up a history
+
+        Args:
+            history_id: Id returned by create
+
+        Returns:
+            EditHistory instance
+
+        Raises:
+            KeyError: If the history does not exist or was dropped
+        """
+        with self._lock:
+            history = self._histories[history_id]
+            self._histories.move_to_end(history_id)
+            return history
+
+    def apply(self, history_id, steps):
+        """
+        Apply steps after the current state, discarding any undone steps
+
+        Args:
+            history_id: History id
+            steps: List of (method, kwargs) tuples
+
+        Returns:
+            Tuple of (EditHistory, PNG bytes of the new current state)
+        """
+        history = self.get(history_id)
+        with history.lock:
+            path = history.path[:history.cursor + 1]
+            for method, kwargs in steps:
+                path.append(self._add_node(history, path[-1], method, kwargs))
+            history.path = path
+            history.cursor = len(path) - 1
+            return history, self._materialize(history, history.cursor)
+
+    def edit(self, history_id, index, method, kwargs):
+        """
+        Replace one step and recompute only the states after it
+
+        The state before the edited step is reused from its checkpoint; later
+        steps keep their parameters and are reapplied on top of the new result.
+
+        Args:
+            history_id: History id
+            index: Zero-based index of the step to replace
+            method: New method name
+            kwargs: New method kwargs
+
+        Returns:
+            Tuple of (EditHistory, PNG bytes of the current state)
+
+        Raises:
+            ValueError: If there is no step at index
+        """
+        history = self.get(history_id)
+        with history.lock:
+            steps = history.steps
+            if not 0 <= index < len(steps):
+                raise ValueError(f"No step {index} in history")
+            steps[index] = (method, kwargs)
+
+            path = history.path[:index + 1]
+            for step_method, step_kwargs in steps[index:]:
+                path.append(self._add_node(history, path[-1], step_method, step_kwargs))
+            history.path = path
+            history.cursor = max(history.cursor, index + 1)
+            return history, self._materialize(history, history.cursor)
+
+    def undo(self, history_id):
+        """
+        Move the current state back by one step
+
+        Returns:
+            Tuple of (EditHistory, PNG bytes of the new current state)
+
+        Raises:
+            ValueError: If there is nothing to undo
+        """
+        return self._move(history_id, -1)
+
+    def redo(self, history_id):
+        """
+        Move the current state forward by one undone step
+
+        Returns:
+            Tuple of (EditHistory, PNG bytes of the new current state)
+
+        Raises:
+            ValueError: If there is nothing to redo
+        """
+        return self._move(history_id, 1)
+
+    def current(self, history_id):
+        """
+        Return the image of the current state
+
+        Returns:
+            Tuple of (EditHistory, PNG bytes of the current state)
+        """
+        history = self.get(history_id)
+        with history.lock:
+            return history, self._materialize(history, history.cursor)
+
+    @property
+    def checkpoint_bytes(self):
+        """Total size of the cached checkpoints"""
+        return self._bytes
+
+    def _move(self, history_id, delta):
+        history = self.get(history_id)
+        with history.lock:
+            cursor = history.cursor + delta
+            if not 0 <= cursor < len(history.path):
+                raise ValueError("Nothing to undo" if delta < 0 else "Nothing to redo")
+            history.cursor = cursor
+            return history, self._materialize(history, cursor)
+
+    @staticmethod
+    def _add_node(history, parent, method, kwargs):
+        # Same parent and step always give the same state, so the key doubles as the cache key
+        key = hashlib.sha1((parent + '|' + params_key(method, kwargs)).encode()).hexdigest()
+        if key not in history.nodes:
+            history.nodes[key] = _Node(key, parent, method, kwargs)
+        return key
+
+    def _materialize(self, history, index):
+        """
+        Return the PNG bytes of the state at a path index, recomputing if evicted
+
+        Args:
+            history: EditHistory instance
+            index: Path index (0 is the original upload)
+
+        Returns:
+            PNG bytes
+        """
+        # Walk back to the nearest state that still has a checkpoint
+        start = index
+        data = None
+        while start > 0:
+            data = self._lookup(history.path[start])
+            if data is not None:
+                break
+            start -= 1
+        if start == 0:
+            data = history.root_png
+        if start == index:
+            return data
+
+        # Recompute forward, checkpointing every intermediate state
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+        for i in range(start + 1, index + 1):
+            node = history.nodes[history.path[i]]
+            img = apply_method(self.processor, img, node.method, node.kwargs)
+            data = self._encode(img)
+            self._store(node.key, data)
+        return data
+
+    def _encode(self, img):
+        _, encoded = cv2.imencode('.png', img, self.encode_param)
+        return encoded.tobytes()
+
+    def _lookup(self, key):
+        with self._lock:
+            data = self._checkpoints.get(key)
+            if data is not None:
+                self._checkpoints.move_to_end(key)
+            return data
+
+    def _store(self, key, data):
+        with self._lock:
+            if key in self._checkpoints:
+                self._checkpoints.move_to_end(key)
+                return
+            self._checkpoints[key] = data
+            self._bytes += len(data)
+            # Evict least recently used checkpoints, but always keep the newest one
+            while self._bytes > self.memory_budget and len(self._checkpoints) > 1:
+                _, evicted = self._checkpoints.popitem(last=False)
+                self._bytes -= len(evicted)
@@ -0,0 +1,222 @@
+import os
+import logging
+import threading
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Frames are reference counted with POSIX file locks
+FRAME_STORE_SUPPORTED = fcntl is not None
+
+class FrameHandle:
+    """
+    A reference to a frame in a FrameStore
+
+    While the handle is open it holds a shared lock on the frame's file, which
+    keeps every worker process from evicting it. The array is a read-only,
+    zero-copy view of the memory-mapped file and must not be used after release.
+    """
+
+    def __init__(self, key, fd, array):
+        self.key = key
+        self.array = array
+        self._fd = fd
+
+    def release(self):
+        """Drop the reference (also called when used as a context manager)"""
+        if self._fd is not None:
+            # The mapping itself stays valid until the last view is garbage collected
+            self.array = None
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def __del__(self):
+        self.release()
+
+
+class FrameStore:
+    """
+    Cross-process store of decoded images backed by memory-mapped .npy files
+
+    Any process pointed at the same directory (e.g. every gunicorn worker)
+    shares the frames, so an image decoded by one worker is read by the others
+    without decoding or copying. Reference counting uses shared file locks,
+    which the kernel drops automatically if a worker dies. When the files
+    exceed the byte budget, the least recently used unreferenced frames are
+    deleted.
+    """
+
+    SUFFIX = '.npy'
+
+    def __init__(self, root, byte_budget=512 * 1024 * 1024):
+        """
+        Args:
+            root: Directory holding the frame files
+            byte_budget: Maximum total size of the frame files in bytes
+
+        Raises:
+            RuntimeError: If the platform has no POSIX file locks
+        """
+        if not FRAME_STORE_SUPPORTED:
+            raise RuntimeError("FrameStore needs POSIX file locks (fcntl), which this platform lacks")
+        self.root = root
+        self.byte_budget = byte_budget
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        if not key or os.sep in key or key.startswith('.'):
+            raise ValueError(f"Invalid frame key: {key!r}")
+        return os.path.join(self.root, key + self.SUFFIX)
+
+    def get(self, key):
+        """
+        Open a frame if it is in the store
+
+        Args:
+            key: Frame key (e.g. the content hash of the encoded upload)
+
+        Returns:
+            FrameHandle, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # The file may have been evicted between open and lock
+            if os.fstat(fd).st_nlink == 0:
+                os.close(fd)
+                return None
+            with os.fdopen(os.dup(fd), 'rb') as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                offset = f.tell()
+                array = np.memmap(f, dtype=dtype, mode='r', offset=offset, shape=shape,
+                                  order='F' if fortran_order else 'C')
+        except Exception:
+            os.close(fd)
+            raise
+
+        # Touch the file so eviction sees it as recently used
+        os.utime(path)
+        return FrameHandle(key, fd, array)
+
+    def put(self, key, img):
+        """
+        Add a frame and open it
+
+        Args:
+            key: Frame key
+            img: Image to store
+
+        Returns:
+            FrameHandle for the stored frame
+        """
+        handle = self.get(key)
+        if handle is not None:
+            return handle
+
+        # Write to a private file and rename it into place so readers never see a partial frame
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        frame = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=img.dtype, shape=img.shape)
+        frame[...] = img
+        frame.flush()
+        del frame
+        os.replace(tmp_path, path)
+        logger.debug(f"Stored frame {key} ({img.nbytes} bytes)")
+
+        self.evict()
+        handle = self.get(key)
+        if handle is None:
+            # Evicted straight away by a concurrent worker; keep serving from the array we have
+            return FrameHandle(key, None, img)
+        return handle
+
+    def get_or_decode(self, key, decode):
+        """
+        Open a frame, creating it on a miss
+
+        Args:
+            key: Frame key
+            decode: Function returning the image (or None if it cannot be decoded)
+
+        Returns:
+            FrameHandle, or None if decode returned None
+        """
+        handle = self.get(key)
+        if handle is not None:
+            return handle
+        img = decode()
+        if img is None:
+            return None
+        return self.put(key, img)
+
+    def total_bytes(self):
+        """Total size of the frame files in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """
+        Delete least recently used frames without live references until within budget
+
+        Returns:
+            Number of frames deleted
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            deleted = 0
+            for path, size, _ in entries:
+                if total <= self.byte_budget:
+                    break
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                except FileNotFoundError:
+                    total -= size
+                    continue
+                try:
+                    # Any open handle in any process holds a shared lock
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                try:
+                    os.unlink(path)
+                    total -= size
+                    deleted += 1
+                except FileNotFoundError:
+                    total -= size
+                finally:
+                    os.close(fd)
+            return deleted
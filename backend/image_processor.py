@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 from backend.medical_processor import MedicalImageProcessor
+from backend.denoiser import Denoiser
 
 class ImageProcessor:
     """Class for image enhancement operations using OpenCV"""
@@ -8,33 +9,121 @@ class ImageProcessor:
     def __init__(self):
         # Initialize medical image processor
         self.medical_processor = MedicalImageProcessor()
+        
+        # Tiered noise reduction engine
+        self.denoiser = Denoiser()
     
-    def histogram_equalization(self, img):
+    @staticmethod
+    def _output_buffer(img, out=None, inplace=False, shape=None):
+        """
+        Resolve where a method should write its result
+        
+        Args:
+            img: Input image
+            out: Optional preallocated output array
+            inplace: If True, write the result into img itself
+            shape: Expected output shape (defaults to img.shape)
+            
+        Returns:
+            Destination array, or None to let OpenCV allocate one
+        """
+        shape = img.shape if shape is None else tuple(shape)
+        if inplace:
+            if out is not None and out is not img:
+                raise ValueError("Pass either out= or inplace=True, not both")
+            if shape != img.shape:
+                raise ValueError("This operation changes the image shape and cannot run in place")
+            out = img
+        if out is not None and (out.shape != shape or out.dtype != np.uint8):
+            # OpenCV would silently allocate a new array instead of writing into out
+            raise ValueError(f"out must be a uint8 array of shape {shape}, got {out.dtype} {out.shape}")
+        return out
+    
+    @staticmethod
+    def _gray_to_output(img, gray, dst):
+        """
+        Return a single-channel result in the input image's channel layout
+        
+        Args:
+            img: Original input image
+            gray: Single-channel result
+            dst: Destination array from _output_buffer (or None)
+            
+        Returns:
+            Result with the same number of channels as img
+        """
+        if len(img.shape) == 3:
+            return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=dst)
+        if dst is not None and dst is not gray:
+            np.copyto(dst, gray)
+            return dst
+        return gray
+    
+    @staticmethod
+    def _equalization_table(hist):
+        """
+        Build the lookup table cv2.equalizeHist would derive from a histogram
+        
+        Args:
+            hist: 256-bin intensity histogram
+            
+        Returns:
+            256-entry uint8 lookup table
+        """
+        occupied = np.flatnonzero(hist)
+        if occupied.size == 0:
+            return np.arange(256, dtype=np.uint8)
+        first = occupied[0]
+        total = hist.sum()
+        if hist[first] == total:
+            # Single-valued image maps everything to that value
+            return np.full(256, first, dtype=np.uint8)
+        
+        # Same float32 arithmetic and rounding as OpenCV
+        scale = np.float32(255.0) / np.float32(total - hist[first])
+        cdf = (np.cumsum(hist) - hist[first]).astype(np.float32)
+        table = np.clip(np.rint(cdf * scale), 0, 255).astype(np.uint8)
+        table[:first + 1] = 0
+        return table
+    
+    def histogram_equalization(self, img, stats=None, out=None, inplace=False):
         """
         Enhance contrast using histogram equalization
         
         Args:
             img: Input image (BGR format)
+            stats: Optional cached ImageStats of img, whose Y-of-YUV histogram is reused
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Enhanced image
         """
+        dst = self._output_buffer(img, out, inplace)
+        
         # Convert to YUV color space
         img_yuv = cv2.cvtColor(img, cv2.COLOR_BGR2YUV)
         
         # Apply histogram equalization to the Y channel
-        img_yuv[:,:,0] = cv2.equalizeHist(img_yuv[:,:,0])
+        y = cv2.extractChannel(img_yuv, 0)
+        if stats is not None:
+            cv2.LUT(y, self._equalization_table(stats.yuv_luma_histogram(y)), dst=y)
+        else:
+            cv2.equalizeHist(y, dst=y)
+        cv2.insertChannel(y, img_yuv, 0)
         
         # Convert back to BGR
-        return cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR)
+        return cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR, dst=dst)
     
-    def gamma_correction(self, img, gamma=1.0):
+    def gamma_correction(self, img, gamma=1.0, out=None, inplace=False):
         """
         Apply gamma correction to adjust brightness non-linearly
         
         Args:
             img: Input image
             gamma: Gamma value (1.0 is unchanged)
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Gamma-corrected image
@@ -53,9 +142,9 @@ class ImageProcessor:
         ]).astype("uint8")
         
         # Apply lookup table
-        return cv2.LUT(img, table)
+        return cv2.LUT(img, table, dst=self._output_buffer(img, out, inplace))
     
-    def unsharp_mask(self, img, kernel_size=(5, 5), sigma=1.0, amount=1.0, threshold=0):
+    def unsharp_mask(self, img, kernel_size=(5, 5), sigma=1.0, amount=1.0, threshold=0, out=None, inplace=False):
         """
         Apply unsharp mask to sharpen the image
         
@@ -65,33 +154,42 @@ class ImageProcessor:
             sigma: Standard deviation for Gaussian blur
             amount: Strength of sharpening effect
             threshold: Minimum brightness difference
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Sharpened image
         """
+        dst = self._output_buffer(img, out, inplace)
+        
         # Apply Gaussian blur
         blurred = cv2.GaussianBlur(img, kernel_size, sigma)
         
-        # Calculate sharpened image
-        sharpened = float(amount + 1) * img - float(amount) * blurred
-        
-        # Clip values to valid range
-        sharpened = np.maximum(np.minimum(sharpened, 255), 0).astype(np.uint8)
-        
-        # Apply threshold if specified
         if threshold > 0:
-            low_contrast_mask = np.absolute(img - blurred) < threshold
-            np.copyto(sharpened, img, where=low_contrast_mask)
+            # Find low-contrast pixels before img may be overwritten
+            low_contrast_mask = cv2.absdiff(img, blurred) < threshold
             
-        return sharpened
+            # Sharpen into the blur buffer with saturating uint8 arithmetic
+            sharpened = cv2.addWeighted(img, float(amount + 1), blurred, -float(amount), 0, dst=blurred)
+            np.copyto(sharpened, img, where=low_contrast_mask)
+            if dst is None:
+                return sharpened
+            np.copyto(dst, sharpened)
+            return dst
+        
+        # Calculate sharpened image: (amount + 1) * img - amount * blurred, saturated to uint8
+        return cv2.addWeighted(img, float(amount + 1), blurred, -float(amount), 0,
+                               dst=blurred if dst is None else dst)
     
-    def gaussian_blur(self, img, radius=3):
+    def gaussian_blur(self, img, radius=3, out=None, inplace=False):
         """
         Apply Gaussian blur to smooth the image
         
         Args:
             img: Input image
             radius: Radius of blur (must be odd)
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Blurred image
@@ -100,9 +198,9 @@ class ImageProcessor:
         if radius % 2 == 0:
             radius += 1
             
-        return cv2.GaussianBlur(img, (radius, radius), 0)
+        return cv2.GaussianBlur(img, (radius, radius), 0, dst=self._output_buffer(img, out, inplace))
         
-    def edge_detection(self, img, method='sobel', threshold1=100, threshold2=200):
+    def edge_detection(self, img, method='sobel', threshold1=100, threshold2=200, out=None, inplace=False):
         """
         Apply edge detection to the image
         
@@ -111,55 +209,67 @@ class ImageProcessor:
             method: 'sobel' or 'canny'
             threshold1: First threshold for Canny detector
             threshold2: Second threshold for Canny detector
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Edge-detected image
         """
-        # Convert to grayscale if needed
+        dst = self._output_buffer(img, out, inplace)
+        
+        # Convert to grayscale if needed (read-only, so no copy for grayscale input)
         if len(img.shape) == 3:
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         else:
-            gray = img.copy()
+            gray = img
         
         if method.lower() == 'sobel':
             # Apply Sobel operator
-            sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-            sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+            sobelx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+            sobely = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
             
-            # Compute magnitude
-            magnitude = np.sqrt(sobelx**2 + sobely**2).astype(np.uint8)
+            # Compute magnitude into the x-gradient buffer
+            magnitude = cv2.magnitude(sobelx, sobely, sobelx)
             
-            # Create color edge image
             if len(img.shape) == 3:
-                # Create a colored edge image
-                edge_img = img.copy()
-                edge_img[magnitude < 50] = 0  # Black out low-magnitude areas
-                return edge_img
+                # Create a colored edge image by blacking out low-magnitude areas
+                background = magnitude < 50
             else:
-                return magnitude
+                return cv2.convertScaleAbs(magnitude, dst)
                 
         elif method.lower() == 'canny':
-            # Apply Canny edge detector
-            edges = cv2.Canny(gray, threshold1, threshold2)
-            
             if len(img.shape) == 3:
-                # Create a colored edge image
-                edge_img = img.copy()
-                edge_img[edges == 0] = 0  # Black out non-edge areas
-                return edge_img
+                # Create a colored edge image by blacking out non-edge areas
+                background = cv2.Canny(gray, threshold1, threshold2) == 0
             else:
-                return edges
+                # Canny cannot write over its own input
+                if dst is img:
+                    np.copyto(img, cv2.Canny(gray, threshold1, threshold2))
+                    return img
+                return cv2.Canny(gray, threshold1, threshold2, dst)
                 
         else:
-            return img  # Return original if method not recognized
+            # Return original if method not recognized
+            if dst is not None and dst is not img:
+                np.copyto(dst, img)
+                return dst
+            return img
+        
+        edge_img = img.copy() if dst is None else dst
+        if edge_img is not img:
+            np.copyto(edge_img, img)
+        edge_img[background] = 0
+        return edge_img
     
-    def super_resolution(self, img, scale_factor=2):
+    def super_resolution(self, img, scale_factor=2, out=None, inplace=False):
         """
         Apply basic super resolution by resizing with better interpolation
         
         Args:
             img: Input image
             scale_factor: Factor to scale the image (2 = 2x size)
+            out: Optional preallocated output array of the upscaled shape
+            inplace: Not supported (the output shape differs from the input)
             
         Returns:
             Upscaled image
@@ -169,11 +279,12 @@ class ImageProcessor:
         
         # Calculate new dimensions
         new_h, new_w = h * scale_factor, w * scale_factor
+        dst = self._output_buffer(img, out, inplace, shape=(new_h, new_w) + img.shape[2:])
         
         # Resize with cubic interpolation (better quality than linear)
-        return cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
+        return cv2.resize(img, (new_w, new_h), dst=dst, interpolation=cv2.INTER_CUBIC)
     
-    def color_balance(self, img, r_factor=1.0, g_factor=1.0, b_factor=1.0):
+    def color_balance(self, img, r_factor=1.0, g_factor=1.0, b_factor=1.0, out=None, inplace=False):
         """
         Adjust RGB color channels independently
         
@@ -182,34 +293,33 @@ class ImageProcessor:
             r_factor: Red channel multiplier
             g_factor: Green channel multiplier
             b_factor: Blue channel multiplier
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Color balanced image
         """
-        # Split the image into BGR channels
-        b, g, r = cv2.split(img)
+        # Per-channel lookup table (BGR order) applying each multiplier
+        levels = np.arange(256, dtype=np.float64)[:, None]
+        table = np.clip(levels * [b_factor, g_factor, r_factor], 0, 255).astype(np.uint8)
         
-        # Apply multipliers to each channel
-        r = np.clip(r * r_factor, 0, 255).astype(np.uint8)
-        g = np.clip(g * g_factor, 0, 255).astype(np.uint8)
-        b = np.clip(b * b_factor, 0, 255).astype(np.uint8)
-        
-        # Merge the channels back
-        return cv2.merge([b, g, r])
+        # Apply lookup table to all channels in one pass
+        return cv2.LUT(img, table.reshape(256, 1, 3), dst=self._output_buffer(img, out, inplace))
     
-    def sepia_filter(self, img, intensity=0.5):
+    def sepia_filter(self, img, intensity=0.5, out=None, inplace=False):
         """
         Apply sepia tone effect for a vintage look
         
         Args:
             img: Input image
             intensity: Strength of sepia effect (0-1)
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Sepia-toned image
         """
-        # Convert to float to avoid overflow
-        img_float = img.astype(float) / 255.0
+        dst = self._output_buffer(img, out, inplace)
         
         # Sepia matrix
         sepia_matrix = np.array([
@@ -218,41 +328,41 @@ class ImageProcessor:
             [0.272, 0.534, 0.131]
         ])
         
-        # Convert to sepia
-        sepia_img = np.zeros_like(img_float)
-        for i in range(3):
-            sepia_img[:,:,i] = np.sum(img_float * sepia_matrix[i], axis=2)
-        
-        # Clip values to valid range
-        sepia_img = np.clip(sepia_img, 0, 1)
+        # Convert to sepia (saturating uint8 clips values to the valid range)
+        sepia_img = cv2.transform(img, sepia_matrix)
         
         # Blend with original based on intensity
-        blended = cv2.addWeighted(img_float, 1 - intensity, sepia_img, intensity, 0)
-        
-        # Convert back to uint8
-        return (blended * 255).astype(np.uint8)
+        return cv2.addWeighted(img, 1 - intensity, sepia_img, intensity, 0,
+                               dst=sepia_img if dst is None else dst)
     
-    def noise_reduction(self, img, strength=7):
+    def noise_reduction(self, img, strength=7, tier='full', latency_budget=None, out=None, inplace=False):
         """
-        Apply noise reduction using Non-Local Means Denoising
+        Apply noise reduction using Non-Local Means Denoising or a faster tier
         
         Args:
             img: Input image
             strength: Strength of noise reduction (higher values = more smoothing)
+            tier: 'fast' (bilateral), 'luma' (NLM on luma only), 'reduced' (NLM with a
+                  smaller search window), 'full' (full NLM) or 'auto'
+            latency_budget: Time budget in seconds used to pick the 'auto' tier
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Denoised image
         """
-        # Apply Non-Local Means Denoising
-        return cv2.fastNlMeansDenoisingColored(img, None, strength, strength, 7, 21)
+        return self.denoiser.denoise(img, strength, tier, latency_budget,
+                                     out=self._output_buffer(img, out, inplace))
     
-    def sharpen(self, img, strength=1.0):
+    def sharpen(self, img, strength=1.0, out=None, inplace=False):
         """
         Sharpen image using an unsharp mask with predefined parameters
         
         Args:
             img: Input image
             strength: Sharpen strength multiplier
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Sharpened image
@@ -262,15 +372,12 @@ class ImageProcessor:
                           [-1, 9 + strength, -1],
                           [-1, -1, -1]], dtype=np.float32)
         
-        # Apply kernel
-        sharpened = cv2.filter2D(img, -1, kernel)
-        
-        # Ensure values are in valid range
-        return np.clip(sharpened, 0, 255).astype(np.uint8)
+        # Apply kernel (uint8 output is already saturated to the valid range)
+        return cv2.filter2D(img, -1, kernel, dst=self._output_buffer(img, out, inplace))
         
     # Medical image processing methods
     
-    def clahe_enhance(self, img, clip_limit=2.0, grid_size=8):
+    def clahe_enhance(self, img, clip_limit=2.0, grid_size=8, out=None, inplace=False):
         """
         CLAHE (Contrast Limited Adaptive Histogram Equalization) for medical images
         
@@ -278,6 +385,8 @@ class ImageProcessor:
             img: Input image
             clip_limit: Threshold for contrast limiting
             grid_size: Size of grid for histogram equalization
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             CLAHE enhanced image
@@ -286,9 +395,10 @@ class ImageProcessor:
         if isinstance(grid_size, int):
             grid_size = (grid_size, grid_size)
             
-        return self.medical_processor.clahe_enhance(img, clip_limit, grid_size)
+        return self.medical_processor.clahe_enhance(img, clip_limit, grid_size,
+                                                    out=self._output_buffer(img, out, inplace))
     
-    def dicom_window(self, img, window_width=400, window_level=50):
+    def dicom_window(self, img, window_width=400, window_level=50, stats=None, out=None, inplace=False):
         """
         Apply DICOM windowing for medical images
         
@@ -296,24 +406,36 @@ class ImageProcessor:
             img: Input image
             window_width: Window width (contrast)
             window_level: Window level (brightness)
+            stats: Optional cached ImageStats of img, whose luma range is reused
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Windowed image
         """
-        return self.medical_processor.dicom_window_level(img, window_width, window_level)
+        return self.medical_processor.dicom_window_level(img, window_width, window_level,
+                                                         out=self._output_buffer(img, out, inplace),
+                                                         stats=stats)
     
-    def enhance_vessels(self, img, strength=1.5):
+    def enhance_vessels(self, img, strength=1.5, mode='unsharp', sigmas=None, dark_vessels=True,
+                        out=None, inplace=False):
         """
         Enhance blood vessels visibility in angiograms
         
         Args:
             img: Input image
             strength: Enhancement strength
+            mode: 'unsharp' or 'frangi' (multi-scale Hessian vesselness)
+            sigmas: Vessel scales in pixels for the 'frangi' mode
+            dark_vessels: True if vessels are darker than the background ('frangi' mode)
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Vessel-enhanced image
         """
-        return self.medical_processor.enhance_vessels(img, strength)
+        return self.medical_processor.enhance_vessels(img, strength, mode, sigmas, dark_vessels,
+                                                      out=self._output_buffer(img, out, inplace))
         
     def extract_color_palette(self, img, num_colors=5):
         """
@@ -366,76 +488,91 @@ class ImageProcessor:
                 
         return palette
         
-    def bit_plane_slicing(self, img, bit_plane=7):
+    def bit_plane_slicing(self, img, bit_plane=7, out=None, inplace=False):
         """
         Extract a specific bit plane from the image
         
         Args:
             img: Input image
             bit_plane: Which bit plane to extract (0-7, where 7 is MSB)
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Image with only the specified bit plane visible
         """
-        # Convert to grayscale if needed
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = img.copy()
-        
-        # Extract the bit plane
-        bit_img = np.zeros_like(gray)
-        rows, cols = gray.shape
+        dst = self._output_buffer(img, out, inplace)
         
         # Create the mask for the specified bit plane (2^bit_plane)
         mask = 1 << bit_plane
         
-        # Apply mask and normalize to 0 or 255
-        bit_img = (gray & mask) != 0
-        bit_img = bit_img.astype(np.uint8) * 255
+        # Lookup table mapping each level to 0 or 255 depending on the bit
+        table = np.where(np.arange(256) & mask, 255, 0).astype(np.uint8)
         
-        # Return the original image shape format
+        # Convert to grayscale if needed and apply the table
         if len(img.shape) == 3:
-            return cv2.cvtColor(bit_img, cv2.COLOR_GRAY2BGR)
-        else:
-            return bit_img
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            cv2.LUT(gray, table, dst=gray)
+            return self._gray_to_output(img, gray, dst)
+        return cv2.LUT(img, table, dst=dst)
     
-    def log_transformation(self, img, c=1.0):
+    def log_transformation(self, img, c=1.0, stats=None, out=None, inplace=False):
         """
         Apply logarithmic transformation to expand dark pixels
         
         Args:
             img: Input image
             c: Scaling constant
+            stats: Optional cached ImageStats of img, whose channel maxima are reused
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Log-transformed image
         """
-        # Convert to float for log operation
-        img_float = img.astype(np.float32)
+        dst = self._output_buffer(img, out, inplace)
         
+        # Per-channel maxima, from the cached statistics or computed without a float copy
+        channels = img.shape[2] if len(img.shape) == 3 else 1
+        if stats is not None:
+            names = stats.channels or ['luma']
+            max_vals = np.array([stats.max[name] for name in names], dtype=np.float32)
+        else:
+            max_vals = img.reshape(-1, channels).max(axis=0).astype(np.float32)
+        
+        # Apply as a lookup table
+        table = self.log_table(max_vals)
+        if channels == 1:
+            return cv2.LUT(img, table[:, 0], dst=dst)
+        return cv2.LUT(img, table.reshape(256, 1, channels), dst=dst)
+    
+    @staticmethod
+    def log_table(max_vals):
+        """
+        Build per-channel log transformation lookup tables
+        
+        Shared by log_transformation and the client-side point LUTs, so both
+        apply the same table.
+        
+        Args:
+            max_vals: Maximum intensity of each channel
+            
+        Returns:
+            256 x channels uint8 lookup table
+        """
         # Apply log transform: s = c * log(1 + r)
         # Adjust c to use the full dynamic range
-        if len(img.shape) == 3:
-            result = np.zeros_like(img_float)
-            for i in range(3):  # Apply to each channel
-                max_val = np.max(img_float[:,:,i])
-                if max_val > 0:  # Prevent division by zero
-                    c_adjusted = 255 / np.log(1 + max_val)
-                    result[:,:,i] = c_adjusted * np.log(1 + img_float[:,:,i])
-        else:
-            max_val = np.max(img_float)
+        levels = np.log1p(np.arange(256, dtype=np.float32))
+        table = np.zeros((256, len(max_vals)), dtype=np.float32)
+        for i, max_val in enumerate(max_vals):
             if max_val > 0:  # Prevent division by zero
                 c_adjusted = 255 / np.log(1 + max_val)
-                result = c_adjusted * np.log(1 + img_float)
-            else:
-                result = img_float.copy()
+                table[:, i] = c_adjusted * levels
         
         # Clip and convert back to uint8
-        result = np.clip(result, 0, 255).astype(np.uint8)
-        return result
+        return np.clip(table, 0, 255).astype(np.uint8)
     
-    def gray_level_slicing(self, img, min_val=100, max_val=200, highlight_only=False):
+    def gray_level_slicing(self, img, min_val=100, max_val=200, highlight_only=False, out=None, inplace=False):
         """
         Highlight a specific range of gray levels
         
@@ -444,36 +581,32 @@ class ImageProcessor:
             min_val: Minimum gray level to highlight
             max_val: Maximum gray level to highlight
             highlight_only: If True, only show highlighted pixels, otherwise show highlighted region over original image
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Image with highlighted gray level range
         """
-        # Convert to grayscale if needed
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = img.copy()
-        
-        # Create the mask for the specified range
-        mask = (gray >= min_val) & (gray <= max_val)
+        dst = self._output_buffer(img, out, inplace)
         
-        # Create output image
+        # Lookup table: highlighted range becomes white
+        levels = np.arange(256)
+        mask = (levels >= min_val) & (levels <= max_val)
         if highlight_only:
             # Only show highlighted pixels (white) on black background
-            result = np.zeros_like(gray)
-            result[mask] = 255
+            table = np.where(mask, 255, 0).astype(np.uint8)
         else:
             # Show highlighted pixels (white) while keeping other pixels as original
-            result = gray.copy()
-            result[mask] = 255
+            table = np.where(mask, 255, levels).astype(np.uint8)
         
-        # Return the original image shape format
+        # Convert to grayscale if needed and apply the table
         if len(img.shape) == 3:
-            return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
-        else:
-            return result
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            cv2.LUT(gray, table, dst=gray)
+            return self._gray_to_output(img, gray, dst)
+        return cv2.LUT(img, table, dst=dst)
             
-    def piecewise_linear_transform(self, img, points):
+    def piecewise_linear_transform(self, img, points, out=None, inplace=False):
         """
         Apply a piecewise linear transformation based on control points
         
@@ -482,15 +615,13 @@ class ImageProcessor:
             points: List of (x, y) control points defining the transformation
                    where x is input intensity and y is output intensity
                    Must include points (0, 0) and (255, 255) or similar range
+            out: Optional preallocated output array
+            inplace: If True, overwrite img with the result
             
         Returns:
             Transformed image
         """
-        # Convert to grayscale if needed
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = img.copy()
+        dst = self._output_buffer(img, out, inplace)
             
         # Sort points by x value
         points.sort(key=lambda p: p[0])
@@ -512,11 +643,9 @@ class ImageProcessor:
                 y = y1 + (y2 - y1) * (x - x1) / (x2 - x1)
                 lut[x] = np.clip(int(y), 0, 255)
         
-        # Apply the lookup table
-        result = cv2.LUT(gray, lut)
-        
-        # Return the original image shape format
+        # Convert to grayscale if needed and apply the lookup table
         if len(img.shape) == 3:
-            return cv2.cvtColor(result, cv2.COLOR_GRAY2BGR)
-        else:
-            return result
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            cv2.LUT(gray, lut, dst=gray)
+            return self._gray_to_output(img, gray, dst)
+        return cv2.LUT(img, lut, dst=dst)
@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+class ImageStats:
+    """Per-channel and luma intensity statistics of an 8-bit image"""
+
+    PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+    def __init__(self, img):
+        """
+        Compute all statistics from one histogram pass per channel
+
+        Args:
+            img: Input image (BGR or grayscale, uint8)
+        """
+        self.height, self.width = img.shape[:2]
+        self.pixels = self.height * self.width
+
+        # Histograms are the only full-image passes; everything else derives from them
+        self.histograms = {}
+        if len(img.shape) == 3:
+            for i, name in enumerate(('b', 'g', 'r')):
+                self.histograms[name] = self._histogram(img, i)
+            self.histograms['luma'] = self._histogram(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), 0)
+        else:
+            self.histograms['luma'] = self._histogram(img, 0)
+
+        # Y of YUV rounds differently from BGR2GRAY; filled on first use by yuv_luma_histogram
+        self._yuv_luma_histogram = None
+
+        levels = np.arange(256)
+        self.min = {}
+        self.max = {}
+        self.mean = {}
+        self.percentiles = {}
+        for name, hist in self.histograms.items():
+            occupied = np.flatnonzero(hist)
+            self.min[name] = int(occupied[0]) if occupied.size else 0
+            self.max[name] = int(occupied[-1]) if occupied.size else 0
+            self.mean[name] = float(hist @ levels / self.pixels) if self.pixels else 0.0
+            cdf = np.cumsum(hist)
+            self.percentiles[name] = {
+                p: int(np.searchsorted(cdf, self.pixels * p / 100.0)) for p in self.PERCENTILES
+            }
+
+    @staticmethod
+    def _histogram(img, channel):
+        return cv2.calcHist([img], [channel], None, [256], [0, 256]).ravel().astype(np.int64)
+
+    def yuv_luma_histogram(self, y):
+        """
+        Histogram of the Y channel of YUV, as used by histogram equalization
+
+        BGR2YUV and BGR2GRAY round luma differently, so the 'luma' histogram
+        cannot stand in for it. It is computed from y on first use and cached.
+
+        Args:
+            y: Y channel of the image converted with COLOR_BGR2YUV
+
+        Returns:
+            256-bin int64 histogram
+        """
+        if self._yuv_luma_histogram is None:
+            self._yuv_luma_histogram = self._histogram(y, 0)
+        return self._yuv_luma_histogram
+
+    @property
+    def channels(self):
+        """Names of the colour channels (empty for grayscale images)"""
+        return [name for name in ('b', 'g', 'r') if name in self.histograms]
+
+    def to_dict(self):
+        """
+        Convert the statistics to a JSON-serializable dict
+
+        Returns:
+            Dict with image size and per-channel histogram, min, max, mean and percentiles
+        """
+        return {
+            'width': self.width,
+            'height': self.height,
+            'channels': {
+                name: {
+                    'histogram': self.histograms[name].tolist(),
+                    'min': self.min[name],
+                    'max': self.max[name],
+                    'mean': round(self.mean[name], 3),
+                    'percentiles': {str(p): v for p, v in self.percentiles[name].items()},
+                }
+                for name in self.histograms
+            },
+        }
+
+
+class StatsCache:
+    """Thread-safe LRU cache of ImageStats keyed by image content hash"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """
+        Return cached statistics without computing them
+
+        Args:
+            key: Content hash of the encoded image
+
+        Returns:
+            ImageStats instance, or None on a miss
+        """
+        with self._lock:
+            stats = self._entries.get(key)
+            if stats is not None:
+                self._entries.move_to_end(key)
+            return stats
+
+    def get(self, key, img):
+        """
+        Return cached statistics for an image, computing them on a miss
+
+        Args:
+            key: Content hash of the encoded image
+            img: Decoded image (used only on a cache miss)
+
+        Returns:
+            ImageStats instance
+        """
+        stats = self.lookup(key)
+        if stats is not None:
+            return stats
+
+        # Compute outside the lock; a concurrent duplicate computation is harmless
+        stats = ImageStats(img)
+        with self._lock:
+            self._entries[key] = stats
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stats
@@ -1,10 +1,17 @@
 import cv2
 import numpy as np
+from backend.vesselness import VesselnessFilter
 
 class MedicalImageProcessor:
     """Class for specialized medical image enhancement operations"""
     
-    def clahe_enhance(self, img, clip_limit=2.0, grid_size=(8, 8)):
+    VESSEL_MODES = ('unsharp', 'frangi')
+    
+    def __init__(self):
+        # Multi-scale Hessian filter used by the 'frangi' vessel enhancement mode
+        self.vesselness_filter = VesselnessFilter()
+    
+    def clahe_enhance(self, img, clip_limit=2.0, grid_size=(8, 8), out=None):
         """
         CLAHE (Contrast Limited Adaptive Histogram Equalization) for X-ray/MRI enhancement
         
@@ -12,6 +19,7 @@ class MedicalImageProcessor:
             img: Input image (BGR format)
             clip_limit: Threshold for contrast limiting
             grid_size: Size of grid for histogram equalization
+            out: Optional preallocated output array (may be img itself)
             
         Returns:
             Enhanced image
@@ -19,17 +27,18 @@ class MedicalImageProcessor:
         # Convert to LAB color space
         lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
         
-        # Split channels
-        l, a, b = cv2.split(lab)
+        # Extract the L-channel
+        l = cv2.extractChannel(lab, 0)
         
         # Apply CLAHE to L-channel
         clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=grid_size)
-        l_clahe = clahe.apply(l)
+        clahe.apply(l, dst=l)
         
-        # Merge channels and convert back to BGR
-        return cv2.cvtColor(cv2.merge([l_clahe, a, b]), cv2.COLOR_LAB2BGR)
+        # Put the channel back and convert to BGR
+        cv2.insertChannel(l, lab, 0)
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=out)
     
-    def dicom_window_level(self, img, window_width=400, window_level=50):
+    def dicom_window_level(self, img, window_width=400, window_level=50, out=None, stats=None):
         """
         Adjust DICOM windowing for medical images (CT/MRI)
         
@@ -37,45 +46,68 @@ class MedicalImageProcessor:
             img: Input image
             window_width: Width of the window (contrast)
             window_level: Center of the window (brightness)
+            out: Optional preallocated output array (may be img itself)
+            stats: Optional cached ImageStats of img, whose luma range is reused
             
         Returns:
             Windowed image
         """
+        # Calculate window boundaries, limited to the uint8 range
+        lower = max(window_level - window_width // 2, 0)
+        upper = min(window_level + window_width // 2, 255)
+        
         # Convert to grayscale if not already
         if len(img.shape) > 2:
             img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         else:
-            img_gray = img.copy()
-            
-        # Calculate window boundaries
-        lower = window_level - window_width // 2
-        upper = window_level + window_width // 2
+            img_gray = img
         
-        # Apply windowing
-        img_gray = np.clip(img_gray, lower, upper)
+        # Intensity range of the image (from cached statistics when available)
+        if stats is not None:
+            gray_min, gray_max = stats.min['luma'], stats.max['luma']
+        else:
+            gray_min, gray_max, _, _ = cv2.minMaxLoc(img_gray)
         
-        # Normalize to 0-255
-        img_normalized = cv2.normalize(img_gray, None, 0, 255, cv2.NORM_MINMAX)
+        # Windowing followed by min-max normalization to 0-255, as one lookup table
+        # (float32 scale and shift with a single rounding step, matching cv2.normalize)
+        clip_min = min(max(gray_min, lower), upper)
+        clip_max = min(max(gray_max, lower), upper)
+        levels = np.clip(np.arange(256, dtype=np.float64), lower, upper)
+        scale = 255.0 * (1.0 / (clip_max - clip_min)) if clip_max > clip_min else 0.0
+        shift = -clip_min * scale
+        values = (levels * np.float64(np.float32(scale)) + np.float64(np.float32(shift))).astype(np.float32)
+        table = np.clip(np.rint(values), 0, 255).astype(np.uint8)
         
         # Convert back to 3-channel if input was 3-channel
         if len(img.shape) > 2:
-            return cv2.cvtColor(img_normalized.astype(np.uint8), cv2.COLOR_GRAY2BGR)
+            cv2.LUT(img_gray, table, dst=img_gray)
+            return cv2.cvtColor(img_gray, cv2.COLOR_GRAY2BGR, dst=out)
         else:
-            return img_normalized.astype(np.uint8)
+            return cv2.LUT(img_gray, table, dst=out)
     
-    def enhance_vessels(self, img, strength=1.5):
+    def enhance_vessels(self, img, strength=1.5, mode='unsharp', sigmas=None, dark_vessels=True, out=None):
         """
         Edge enhancement optimized for blood vessels in angiograms
         
         Args:
             img: Input image
             strength: Enhancement strength
+            mode: 'unsharp' (3x3 unsharp mask) or 'frangi' (multi-scale Hessian vesselness)
+            sigmas: Vessel scales in pixels for the 'frangi' mode
+            dark_vessels: True if vessels are darker than the background ('frangi' mode)
+            out: Optional preallocated output array (may be img itself)
             
         Returns:
             Edge-enhanced image for vessel visualization
         """
+        if mode == 'frangi':
+            return self.vesselness_filter.enhance(img, strength, sigmas, dark_vessels, out=out)
+        elif mode not in self.VESSEL_MODES:
+            raise ValueError(f"Unknown vessel enhancement mode: {mode}")
+        
         # Apply slight Gaussian blur
         blurred = cv2.GaussianBlur(img, (3, 3), 0)
         
-        # Apply unsharp mask technique with strength parameter
-        return cv2.addWeighted(img, 1.0 + strength, blurred, -strength, 0)
\ No newline at end of file
+        # Apply unsharp mask technique with strength parameter, reusing the blur buffer
+        return cv2.addWeighted(img, 1.0 + strength, blurred, -strength, 0,
+                               dst=blurred if out is None else out)
\ No newline at end of file
@@ -0,0 +1,292 @@
+import json
+import logging
+import cv2
+import numpy as np
+from backend.denoiser import Denoiser
+from backend.medical_processor import MedicalImageProcessor
+
+logger = logging.getLogger(__name__)
+
+# Map public method names (as sent by the UI) to ImageProcessor attributes
+METHOD_FUNCTIONS = {
+    'histogram_equalization': 'histogram_equalization',
+    'gamma_correction': 'gamma_correction',
+    'unsharp_mask': 'unsharp_mask',
+    'gaussian_blur': 'gaussian_blur',
+    'edge_detection': 'edge_detection',
+    'super_resolution': 'super_resolution',
+    'color_balance': 'color_balance',
+    'sepia_filter': 'sepia_filter',
+    'noise_reduction': 'noise_reduction',
+    'sharpen': 'sharpen',
+    # Medical image processing methods
+    'clahe_enhance': 'clahe_enhance',
+    'dicom_window': 'dicom_window',
+    'enhance_vessels': 'enhance_vessels',
+    # Point processing methods
+    'bit_plane_slicing': 'bit_plane_slicing',
+    'log_transformation': 'log_transformation',
+    'gray_level_slicing': 'gray_level_slicing',
+    'piecewise_linear': 'piecewise_linear_transform',
+}
+
+# Methods that accept cached ImageStats of their input via a 'stats' argument
+STATS_METHODS = frozenset(['histogram_equalization', 'log_transformation', 'dicom_window'])
+
+# Methods whose output shape differs from the input (cannot run in place)
+SHAPE_CHANGING_METHODS = frozenset(['super_resolution'])
+
+DEFAULT_POINTS = [[0, 0], [128, 128], [255, 255]]
+
+
+def parse_points(points_str):
+    """
+    Parse piecewise linear control points from a JSON string
+
+    Args:
+        points_str: JSON list of [x, y] pairs (an already-parsed list is accepted too)
+
+    Returns:
+        List of [x, y] control points (identity transform if invalid)
+    """
+    try:
+        points = json.loads(points_str) if isinstance(points_str, str) else points_str
+        # Validate points
+        if not points or not all(isinstance(p, list) and len(p) == 2 for p in points):
+            raise ValueError("Invalid points format")
+    except (json.JSONDecodeError, TypeError, ValueError) as e:
+        logger.error(f"Invalid points format: {e}")
+        # Default to identity transform
+        points = [list(p) for p in DEFAULT_POINTS]
+    return points
+
+
+def parse_method_params(method, params):
+    """
+    Convert raw form parameters into keyword arguments for a method
+
+    The returned dict is normalized (typed values with defaults filled in),
+    so two requests asking for the same operation produce equal kwargs.
+
+    Args:
+        method: Enhancement method name
+        params: Dict of raw string parameters (e.g. request.form)
+
+    Returns:
+        Dict of keyword arguments for the ImageProcessor method
+
+    Raises:
+        ValueError: If the method or one of its options is unknown
+    """
+    if method == 'histogram_equalization':
+        return {}
+    elif method == 'gamma_correction':
+        return {'gamma': float(params.get('gamma', 1.0))}
+    elif method == 'unsharp_mask':
+        radius = int(params.get('radius', 5))
+        return {'kernel_size': (radius, radius), 'amount': float(params.get('amount', 1.0))}
+    elif method == 'gaussian_blur':
+        return {'radius': int(params.get('radius', 5))}
+    elif method == 'edge_detection':
+        return {
+            'method': params.get('detection_method', 'sobel'),
+            'threshold1': int(params.get('threshold1', 100)),
+            'threshold2': int(params.get('threshold2', 200)),
+        }
+    elif method == 'super_resolution':
+        return {'scale_factor': int(params.get('scale_factor', 2))}
+    elif method == 'color_balance':
+        return {
+            'r_factor': float(params.get('r_factor', 1.0)),
+            'g_factor': float(params.get('g_factor', 1.0)),
+            'b_factor': float(params.get('b_factor', 1.0)),
+        }
+    elif method == 'sepia_filter':
+        return {'intensity': float(params.get('intensity', 0.5))}
+    elif method == 'noise_reduction':
+        tier = params.get('tier', 'full')
+        if tier != 'auto' and tier not in Denoiser.TIERS:
+            raise ValueError(f"Unknown denoising tier: {tier}")
+        return {
+            'strength': int(params.get('strength', 7)),
+            'tier': tier,
+            'latency_budget': float(params.get('latency_budget', 2.0)),
+        }
+    elif method == 'sharpen':
+        return {'strength': float(params.get('strength', 1.0))}
+    # Medical image processing methods
+    elif method == 'clahe_enhance':
+        return {
+            'clip_limit': float(params.get('clip_limit', 2.0)),
+            'grid_size': int(params.get('grid_size', 8)),
+        }
+    elif method == 'dicom_window':
+        return {
+            'window_width': int(params.get('window_width', 400)),
+            'window_level': int(params.get('window_level', 50)),
+        }
+    elif method == 'enhance_vessels':
+        sigmas = params.get('sigmas')
+        if isinstance(sigmas, str):
+            sigmas = [s for s in sigmas.split(',') if s.strip()]
+        mode = params.get('mode', 'unsharp')
+        if mode not in MedicalImageProcessor.VESSEL_MODES:
+            raise ValueError(f"Unknown vessel enhancement mode: {mode}")
+        return {
+            'strength': float(params.get('strength', 1.5)),
+            'mode': mode,
+            'sigmas': tuple(float(s) for s in sigmas) if sigmas else None,
+            'dark_vessels': str(params.get('dark_vessels', 'true')).lower() == 'true',
+        }
+    elif method == 'extract_palette':
+        return {'num_colors': int(params.get('num_colors', 5))}
+    elif method == 'bit_plane_slicing':
+        return {'bit_plane': int(params.get('bit_plane', 7))}
+    elif method == 'log_transformation':
+        return {'c': float(params.get('c', 1.0))}
+    elif method == 'gray_level_slicing':
+        return {
+            'min_val': int(params.get('min_val', 100)),
+            'max_val': int(params.get('max_val', 200)),
+            'highlight_only': str(params.get('highlight_only', 'false')).lower() == 'true',
+        }
+    elif method == 'piecewise_linear':
+        return {'points': parse_points(params.get('points', json.dumps(DEFAULT_POINTS)))}
+    else:
+        raise ValueError(f"Unknown enhancement method: {method}")
+
+
+def output_encoding(img_format='png', quality=0.9):
+    """
+    Resolve the file extension and OpenCV encode parameters for an output format
+
+    Args:
+        img_format: 'png', 'jpg'/'jpeg' or 'webp'
+        quality: Lossy quality in the range 0-1
+
+    Returns:
+        Tuple of (extension, encode parameter list)
+    """
+    if img_format == 'jpg' or img_format == 'jpeg':
+        return '.jpg', [int(cv2.IMWRITE_JPEG_QUALITY), int(float(quality) * 100)]
+    elif img_format == 'webp':
+        return '.webp', [int(cv2.IMWRITE_WEBP_QUALITY), int(float(quality) * 100)]
+    else:
+        return '.png', []
+
+
+def params_key(method, kwargs):
+    """
+    Build a hashable, order-independent key for a method and its kwargs
+
+    Args:
+        method: Enhancement method name
+        kwargs: Normalized kwargs from parse_method_params
+
+    Returns:
+        String key
+    """
+    return method + ':' + json.dumps(kwargs, sort_keys=True, default=list)
+
+
+def apply_method(processor, img, method, kwargs):
+    """
+    Apply an image-producing enhancement method
+
+    Args:
+        processor: ImageProcessor instance
+        img: Input image
+        method: Enhancement method name
+        kwargs: Keyword arguments from parse_method_params
+
+    Returns:
+        Processed image
+
+    Raises:
+        ValueError: If the method is unknown or does not produce an image
+    """
+    if method not in METHOD_FUNCTIONS:
+        raise ValueError(f"Unknown enhancement method: {method}")
+    return getattr(processor, METHOD_FUNCTIONS[method])(img, **kwargs)
+
+
+def parse_pipeline(pipeline_str):
+    """
+    Parse a pipeline of enhancement steps
+
+    Args:
+        pipeline_str: JSON list of {"method": name, "params": {...}} objects
+
+    Returns:
+        List of (method, kwargs) tuples
+
+    Raises:
+        ValueError: If the pipeline is malformed or names an unknown method
+    """
+    try:
+        steps = json.loads(pipeline_str)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid pipeline JSON: {e}")
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("Pipeline must be a non-empty list of steps")
+
+    parsed = []
+    for step in steps:
+        if not isinstance(step, dict) or 'method' not in step:
+            raise ValueError("Each pipeline step must be an object with a 'method'")
+        method = step['method']
+        if method not in METHOD_FUNCTIONS:
+            raise ValueError(f"Unknown enhancement method: {method}")
+        parsed.append((method, parse_method_params(method, step.get('params', {}))))
+    return parsed
+
+
+def parse_steps(params):
+    """
+    Read the processing steps from request parameters
+
+    A 'pipeline' parameter takes precedence; otherwise the single 'method'
+    with its parameters forms a one-step pipeline.
+
+    Args:
+        params: Dict of raw string parameters (e.g. request.form)
+
+    Returns:
+        List of (method, kwargs) tuples
+
+    Raises:
+        ValueError: If the steps are invalid
+    """
+    if params.get('pipeline'):
+        return parse_pipeline(params['pipeline'])
+    method = params.get('method', '')
+    kwargs = parse_method_params(method, params)
+    if method not in METHOD_FUNCTIONS:
+        raise ValueError(f"Method {method} does not produce an image")
+    return [(method, kwargs)]
+
+
+def apply_pipeline(processor, img, steps):
+    """
+    Apply a sequence of enhancement steps to an image
+
+    Intermediate results belong to the pipeline, so every step after the
+    first runs in place unless it changes the image shape. A step that
+    returns the input image itself is copied before anything is written.
+
+    Args:
+        processor: ImageProcessor instance
+        img: Input image (not modified)
+        steps: List of (method, kwargs) tuples from parse_steps
+
+    Returns:
+        Processed image
+    """
+    source = img
+    for i, (method, kwargs) in enumerate(steps):
+        if i > 0 and method not in SHAPE_CHANGING_METHODS:
+            if np.may_share_memory(img, source):
+                img = img.copy()
+            kwargs = dict(kwargs, inplace=True)
+        img = apply_method(processor, img, method, kwargs)
+    return img
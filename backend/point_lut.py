@@ -0,0 +1,92 @@
+import numpy as np
+from backend.methods import apply_method
+
+# Point operations whose result is a 256-entry table per channel
+LUT_METHODS = frozenset([
+    'gamma_correction',
+    'log_transformation',
+    'piecewise_linear',
+    'gray_level_slicing',
+    'bit_plane_slicing',
+    'color_balance',
+])
+
+# Point operations that convert to grayscale before applying their table
+GRAYSCALE_METHODS = frozenset(['piecewise_linear', 'gray_level_slicing', 'bit_plane_slicing'])
+
+# Point operations whose table depends on the image (needs ImageStats)
+IMAGE_DEPENDENT_METHODS = frozenset(['log_transformation'])
+
+CHANNELS = ('b', 'g', 'r')
+
+
+def compose_point_luts(processor, steps, stats=None):
+    """
+    Compose a pipeline of point operations into one lookup table per channel
+
+    The result reproduces the server rendering as
+    out[c] = lut[c][gray(img) if grayscale else img[c]].
+
+    Args:
+        processor: ImageProcessor instance
+        steps: List of (method, kwargs) tuples
+        stats: ImageStats of the input image (required for image-dependent methods)
+
+    Returns:
+        Tuple of (3 x 256 uint8 array in BGR order, grayscale flag)
+
+    Raises:
+        ValueError: If a step is not a point operation, needs missing statistics,
+                    or converts to grayscale after a colour step
+    """
+    identity = np.tile(np.arange(256, dtype=np.uint8), (3, 1))
+    lut = identity
+    grayscale = False
+
+    for method, kwargs in steps:
+        if method not in LUT_METHODS:
+            raise ValueError(f"{method} is not a point operation and must be rendered by /enhance")
+
+        if method in GRAYSCALE_METHODS:
+            # gray(lut(img)) is only a table of img if the input is still grey and untinted
+            channels_equal = np.array_equal(lut[0], lut[1]) and np.array_equal(lut[0], lut[2])
+            if not (np.array_equal(lut, identity) or (grayscale and channels_equal)):
+                raise ValueError(f"{method} converts to grayscale after a colour adjustment; use /enhance")
+            grayscale = True
+
+        if method in IMAGE_DEPENDENT_METHODS:
+            if stats is None:
+                raise ValueError(f"{method} depends on the image; upload it to get a table")
+            step_lut = _log_step_table(processor, lut, grayscale, stats)
+        else:
+            step_lut = _step_table(processor, method, kwargs)
+
+        # Chain the new step after the tables composed so far
+        lut = np.stack([step_lut[c][lut[c]] for c in range(3)])
+
+    return lut, grayscale
+
+
+def _step_table(processor, method, kwargs):
+    """
+    Derive a step's per-channel table by running it on an intensity ramp
+
+    Every channel of the ramp holds the same value, so grayscale conversion
+    leaves it unchanged and the output is exactly the table the method applies.
+    """
+    ramp = np.repeat(np.arange(256, dtype=np.uint8)[None, :, None], 3, axis=2)
+    result = apply_method(processor, ramp, method, kwargs)
+    return result[0].T
+
+
+def _log_step_table(processor, lut, grayscale, stats):
+    """
+    Build the log transformation table using the channel maxima after prior steps
+    """
+    max_vals = []
+    for c, name in enumerate(CHANNELS):
+        # Levels present in the input channel that feeds this table
+        hist = stats.histograms['luma' if grayscale or name not in stats.histograms else name]
+        present = np.flatnonzero(hist)
+        max_vals.append(float(lut[c][present].max()) if present.size else 0.0)
+    return processor.log_table(np.array(max_vals, dtype=np.float32)).T
@@ -0,0 +1,72 @@
+import json
+import base64
+import cv2
+
+# Methods slow enough at full resolution to be worth a low-resolution preview
+SLOW_METHODS = frozenset(['noise_reduction', 'super_resolution', 'clahe_enhance', 'enhance_vessels'])
+
+# Longest side of the preview input in pixels
+PREVIEW_SIZE = 512
+
+
+def preview_input(img, max_side=PREVIEW_SIZE):
+    """
+    Downscale an image for a quick preview
+
+    Args:
+        img: Full-size input image
+        max_side: Longest side of the preview in pixels
+
+    Returns:
+        Downscaled image, or None if the image is already small enough
+    """
+    height, width = img.shape[:2]
+    longest = max(height, width)
+    if longest <= max_side:
+        return None
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def data_url(data, mimetype='image/png'):
+    """
+    Wrap encoded image bytes in a data URL
+
+    Args:
+        data: Encoded image bytes
+        mimetype: Image MIME type
+
+    Returns:
+        data: URL string
+    """
+    return f"data:{mimetype};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def encode_preview(img, quality=80):
+    """
+    Encode a preview image as a JPEG data URL (smaller and faster than PNG)
+
+    Args:
+        img: Preview image
+        quality: JPEG quality 0-100
+
+    Returns:
+        data: URL string
+    """
+    _, encoded = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return data_url(encoded.tobytes(), 'image/jpeg')
+
+
+def sse_event(event, payload):
+    """
+    Format a server-sent event with a JSON payload
+
+    Args:
+        event: Event name
+        payload: JSON-serializable data
+
+    Returns:
+        Event text
+    """
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
@@ -0,0 +1,179 @@
+import json
+import math
+import cv2
+import numpy as np
+from backend.methods import SHAPE_CHANGING_METHODS, apply_method
+from backend.vesselness import VesselnessFilter
+
+# Widest accepted feather in pixels (the blur kernel grows with it)
+MAX_FEATHER = 256
+
+
+def required_border(method, kwargs):
+    """
+    Number of context pixels a method reads beyond each output pixel
+
+    Processing a crop padded by this border gives the same result inside
+    the ROI as processing the whole image. Methods that derive statistics
+    from the image (histogram_equalization, log_transformation, dicom_window,
+    clahe_enhance, frangi vessel enhancement) compute them over the cropped
+    region instead.
+
+    Args:
+        method: Enhancement method name
+        kwargs: Keyword arguments from parse_method_params
+
+    Returns:
+        Border width in pixels, or None if any pixel can depend on the whole
+        image (Canny's hysteresis follows edges across the image)
+    """
+    if method == 'gaussian_blur':
+        radius = kwargs.get('radius', 3)
+        return (radius + 1 if radius % 2 == 0 else radius) // 2
+    elif method == 'unsharp_mask':
+        return max(kwargs.get('kernel_size', (5, 5))) // 2
+    elif method == 'enhance_vessels' and kwargs.get('mode') == 'frangi':
+        # Widest Gaussian derivative kernel
+        return int(math.ceil(3 * max(kwargs.get('sigmas') or VesselnessFilter.DEFAULT_SIGMAS)))
+    elif method in ('sharpen', 'enhance_vessels'):
+        return 1
+    elif method == 'edge_detection':
+        # Sobel is 3x3; Canny is not local
+        return 1 if kwargs.get('method', 'sobel').lower() == 'sobel' else None
+    elif method == 'noise_reduction':
+        # Half the 21x21 search window plus half the 7x7 template
+        return 13
+    return 0
+
+
+def parse_roi(params):
+    """
+    Parse a rectangular region of interest from request parameters
+
+    Args:
+        params: Dict of raw string parameters; 'roi' holds a JSON [x, y, width, height]
+
+    Returns:
+        Tuple (x, y, width, height), or None if no ROI was given
+
+    Raises:
+        ValueError: If the ROI is malformed
+    """
+    roi_str = params.get('roi')
+    if not roi_str:
+        return None
+    try:
+        rect = json.loads(roi_str)
+        if not isinstance(rect, list) or len(rect) != 4:
+            raise ValueError
+        x, y, w, h = (int(v) for v in rect)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        raise ValueError("ROI must be a JSON list [x, y, width, height]")
+    if w <= 0 or h <= 0:
+        raise ValueError("ROI width and height must be positive")
+    return x, y, w, h
+
+
+def parse_feather(params):
+    """
+    Parse the feather width of a region of interest from request parameters
+
+    Args:
+        params: Dict of raw string parameters; 'feather' holds the width in pixels
+
+    Returns:
+        Feather width in pixels (0 if not given or negative)
+
+    Raises:
+        ValueError: If the width is not an integer or exceeds MAX_FEATHER
+    """
+    try:
+        feather = max(int(params.get('feather', 0)), 0)
+    except (TypeError, ValueError):
+        raise ValueError("Feather must be an integer number of pixels")
+    if feather > MAX_FEATHER:
+        raise ValueError(f"Feather must be at most {MAX_FEATHER} pixels")
+    return feather
+
+
+def apply_method_roi(processor, img, method, kwargs, rect=None, mask=None, feather=0):
+    """
+    Apply an enhancement method to a region of interest only
+
+    The image is cropped to the ROI plus the method's required border (and
+    the feather width), processed, and composited back over a copy of the
+    original, so the cost is proportional to the ROI area. Non-local methods
+    (Canny edge detection) process the whole image and composite the ROI.
+
+    Args:
+        processor: ImageProcessor instance
+        img: Input image (not modified)
+        method: Enhancement method name
+        kwargs: Keyword arguments from parse_method_params
+        rect: Optional (x, y, width, height) rectangle
+        mask: Optional single-channel mask the size of img (non-zero = inside);
+              combined with rect if both are given
+        feather: Width in pixels of the soft transition at the ROI edge (at most MAX_FEATHER)
+
+    Returns:
+        Image with the ROI enhanced
+
+    Raises:
+        ValueError: If the method changes the image size, or the ROI or feather is invalid
+    """
+    if method in SHAPE_CHANGING_METHODS:
+        raise ValueError(f"{method} changes the image size and cannot be applied to a region")
+    if feather > MAX_FEATHER:
+        raise ValueError(f"Feather must be at most {MAX_FEATHER} pixels")
+
+    height, width = img.shape[:2]
+    if mask is not None:
+        if mask.shape[:2] != (height, width):
+            raise ValueError("ROI mask must have the same size as the image")
+        if mask.ndim == 3:
+            mask = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
+
+    # Bounding box of the region, clipped to the image
+    if rect is not None:
+        x, y, w, h = rect
+    else:
+        x, y, w, h = cv2.boundingRect(mask) if mask is not None else (0, 0, width, height)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, width), min(y + h, height)
+    if mask is not None and rect is not None:
+        # Shrink to the part of the mask inside the rectangle
+        bx, by, bw, bh = cv2.boundingRect(mask[y0:y1, x0:x1]) if x1 > x0 and y1 > y0 else (0, 0, 0, 0)
+        x0, y0, x1, y1 = x0 + bx, y0 + by, x0 + bx + bw, y0 + by + bh
+    if x1 <= x0 or y1 <= y0:
+        return img.copy()
+
+    # Crop with enough context for the method and the feathered edge
+    border = required_border(method, kwargs)
+    margin = max(height, width) if border is None else border + max(feather, 0)
+    cx0, cy0 = max(x0 - margin, 0), max(y0 - margin, 0)
+    cx1, cy1 = min(x1 + margin, width), min(y1 + margin, height)
+    crop = img[cy0:cy1, cx0:cx1]
+    processed = apply_method(processor, crop, method, kwargs)
+
+    out = img.copy()
+    region = out[cy0:cy1, cx0:cx1]
+    inner = (slice(y0 - cy0, y1 - cy0), slice(x0 - cx0, x1 - cx0))
+
+    # Hard-edged rectangle: copy the processed pixels straight in
+    if mask is None and feather <= 0:
+        region[inner] = processed[inner]
+        return out
+
+    # Blend weights in crop coordinates
+    alpha = np.zeros(crop.shape[:2], dtype=np.float32)
+    if mask is not None:
+        alpha[inner] = mask[y0:y1, x0:x1] > 0
+    else:
+        alpha[inner] = 1.0
+
+    if feather > 0:
+        cv2.GaussianBlur(alpha, (2 * feather + 1, 2 * feather + 1), 0, dst=alpha)
+        region[...] = cv2.blendLinear(processed, crop, alpha, 1.0 - alpha)
+    else:
+        np.copyto(region, processed, where=(alpha > 0)[..., None] if region.ndim == 3 else alpha > 0)
+    return out
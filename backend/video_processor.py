@@ -0,0 +1,101 @@
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from backend.image_processor import ImageProcessor
+from backend.methods import apply_pipeline
+
+logger = logging.getLogger(__name__)
+
+class VideoProcessor:
+    """Frame-by-frame enhancement of videos and animated images"""
+
+    def __init__(self, processor=None, workers=None, max_in_flight=None):
+        """
+        Args:
+            processor: ImageProcessor instance (a new one is created if omitted)
+            workers: Number of worker threads (defaults to the number of CPUs)
+            max_in_flight: Maximum number of decoded frames queued or being processed
+        """
+        self.processor = processor or ImageProcessor()
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 2
+
+    def process_file(self, input_path, output_path, steps, fourcc='mp4v'):
+        """
+        Enhance every frame of a video (or GIF) and write the result as a video
+
+        Frames are decoded by the calling thread and handed to a thread pool
+        (OpenCV releases the GIL); at most max_in_flight frames are pending at
+        once, and results are written strictly in input order.
+
+        Args:
+            input_path: Path of the input video or animated image
+            output_path: Path of the output video
+            steps: List of (method, kwargs) tuples from parse_steps
+            fourcc: Four-character code of the output codec
+
+        Returns:
+            Dict with frame count, elapsed seconds and frames per second
+
+        Raises:
+            ValueError: If the input cannot be decoded
+        """
+        capture = cv2.VideoCapture(input_path)
+        if not capture.isOpened():
+            raise ValueError("Could not open video")
+
+        # Fall back to a common frame rate for formats that do not report one
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        writer = None
+        frames = 0
+        start = time.perf_counter()
+
+        def write(frame):
+            nonlocal writer, frames
+            if writer is None:
+                # The first result fixes the output size (methods may rescale)
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), source_fps, (w, h))
+                if not writer.isOpened():
+                    raise ValueError(f"Could not open video writer for codec {fourcc}")
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            writer.write(frame)
+            frames += 1
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # FIFO of pending frames preserves output order
+                pending = deque()
+                while True:
+                    ok, frame = capture.read()
+                    if not ok:
+                        break
+                    pending.append(pool.submit(apply_pipeline, self.processor, frame, steps))
+
+                    # Bound memory: wait for the oldest frame before decoding more
+                    if len(pending) >= self.max_in_flight:
+                        write(pending.popleft().result())
+
+                while pending:
+                    write(pending.popleft().result())
+        finally:
+            capture.release()
+            if writer is not None:
+                writer.release()
+
+        if frames == 0:
+            raise ValueError("No frames could be decoded")
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'frames': frames,
+            'seconds': round(elapsed, 3),
+            'fps': round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            'source_fps': source_fps,
+        }
+        logger.debug(f"Processed {frames} frames in {elapsed:.2f}s ({stats['fps']} frames/s)")
+        return stats
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+import cv2
+import numpy as np
+from backend.methods import METHOD_FUNCTIONS, parse_method_params, apply_method
+from backend.image_stats import ImageStats
+
+logger = logging.getLogger(__name__)
+
+# Extra parameter sets reaching code paths the defaults do not
+WARMUP_VARIANTS = {
+    'edge_detection': [{'detection_method': 'canny'}],
+    'enhance_vessels': [{'mode': 'frangi'}],
+    'noise_reduction': [{'tier': 'fast'}, {'tier': 'luma'}],
+}
+
+
+def synthetic_image(size=64):
+    """
+    Build a small deterministic test image with gradients, edges and texture
+
+    Args:
+        size: Side length in pixels
+
+    Returns:
+        BGR uint8 image
+    """
+    ramp = np.linspace(0, 255, size, dtype=np.float32)
+    img = np.empty((size, size, 3), dtype=np.uint8)
+    img[..., 0] = ramp[None, :]
+    img[..., 1] = ramp[:, None]
+    img[..., 2] = 255 - ramp[None, :]
+    cv2.circle(img, (size // 2, size // 2), size // 4, (40, 80, 200), -1)
+    cv2.line(img, (0, size - 1), (size - 1, 0), (20, 20, 20), 2)
+    return img
+
+
+def process_uptime():
+    """
+    Seconds since this process started
+
+    Returns:
+        Uptime in seconds, or None where /proc is unavailable
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime, in clock ticks after boot), counted after the command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class WarmUp:
+    """Runs every registered method once so the first real request avoids cold-start costs"""
+
+    def __init__(self, processor, size=64):
+        """
+        Args:
+            processor: ImageProcessor to warm up
+            size: Side length of the synthetic warm-up image
+        """
+        self.processor = processor
+        self.size = size
+        self.timings = {}
+        self.failed = []
+        self.warmup_seconds = None
+        self.startup_seconds = None
+        self._created = time.perf_counter()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        """True once warm-up has finished"""
+        return self._done.is_set()
+
+    def run(self):
+        """
+        Warm up OpenCV's thread pool, codecs and every registered method
+
+        Failures are logged and reported but do not prevent readiness.
+        """
+        start = time.perf_counter()
+        img = synthetic_image(self.size)
+
+        # Timings of tiny images would skew the denoiser's adaptive tier estimates, so the
+        # tiers run here are reset afterwards (estimates of other tiers are left alone)
+        denoiser = self.processor.denoiser
+        denoiser_costs = denoiser.cost_snapshot()
+        denoised_tiers = set()
+        try:
+            self._time('codecs', self._warm_codecs, img)
+            self._time('image_stats', ImageStats, img)
+            self._time('extract_palette', self.processor.extract_color_palette, img)
+            for method in METHOD_FUNCTIONS:
+                for params in [{}] + WARMUP_VARIANTS.get(method, []):
+                    kwargs = parse_method_params(method, params)
+                    if method == 'noise_reduction':
+                        tier = kwargs['tier']
+                        denoised_tiers.add(denoiser.choose_tier(img, kwargs['latency_budget'])
+                                           if tier == 'auto' else tier)
+                    self._time(method, apply_method, self.processor, img, method, kwargs)
+        finally:
+            denoiser.restore_costs(denoiser_costs, denoised_tiers)
+            self.warmup_seconds = time.perf_counter() - start
+            uptime = process_uptime()
+            self.startup_seconds = uptime if uptime is not None else time.perf_counter() - self._created
+            self._done.set()
+
+        logger.info(f"Warm-up finished in {self.warmup_seconds:.2f}s "
+                    f"(ready {self.startup_seconds:.2f}s after process start)")
+        if self.failed:
+            logger.warning(f"Warm-up failed for: {', '.join(self.failed)}")
+
+    def start(self):
+        """
+        Run the warm-up in a background thread (once; later calls return the same thread)
+
+        Returns:
+            The started thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='picwizard-warmup', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def wait(self, timeout=None):
+        """
+        Block until warm-up has finished
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if warm-up finished
+        """
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """
+        Convert the warm-up status to a JSON-serializable dict
+
+        Returns:
+            Dict with readiness, startup and warm-up durations, per-step timings and failures
+        """
+        return {
+            'ready': self.ready,
+            'startup_seconds': round(self.startup_seconds, 3) if self.startup_seconds is not None else None,
+            'warmup_seconds': round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            'timings': {name: round(seconds, 4) for name, seconds in self.timings.items()},
+            'failed': self.failed,
+        }
+
+    def _time(self, name, func, *args):
+        step_start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception:
+            logger.exception(f"Warm-up step {name} failed")
+            if name not in self.failed:
+                self.failed.append(name)
+        # Variants of one method add up to a single entry
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - step_start
+
+    @staticmethod
+    def _warm_codecs(img):
+        for ext in ('.png', '.jpg', '.webp'):
+            _, encoded = cv2.imencode(ext, img)
+            cv2.imdecode(encoded, cv2.IMREAD_COLOR)
@@ -0,0 +1,11 @@
+"""
+gunicorn settings, loaded automatically when gunicorn runs from the repository root
+
+Each worker warms itself up after it is forked, so the warm-up also runs in
+the workers (not the master) when the app is preloaded.
+"""
+
+
+def post_fork(server, worker):
+    from backend.app import start_warmup
+    start_warmup()
@@ -1,4 +1,5 @@
-from backend.app import app
+from backend.app import app, start_warmup
 
 if __name__ == "__main__":
+    start_warmup()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -8,6 +8,18 @@ let sliderPosition = 50;
 let images = []; // Array to store multiple uploaded images
 let originalImages = []; // Array to store original versions of all images
 let currentImageIndex = 0; // Index of the currently displayed image
+const clientId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`; // Identifies this tab to the server
+let enhanceSeq = 0; // Sequence number of the latest /enhance request
+
+// Point operations rendered in the browser from a server-provided lookup table
+const LUT_METHODS = new Set([
+    'gamma_correction', 'log_transformation', 'piecewise_linear',
+    'gray_level_slicing', 'bit_plane_slicing', 'color_balance'
+]);
+// Point operations whose lookup table depends on the image contents
+const LUT_IMAGE_METHODS = new Set(['log_transformation']);
+// Slow methods requested progressively: a low-resolution preview arrives before the final image
+const PROGRESSIVE_METHODS = new Set(['noise_reduction', 'super_resolution', 'clahe_enhance', 'enhance_vessels']);
 
 // DOM Elements
 document.addEventListener('DOMContentLoaded', function() {
@@ -433,7 +445,8 @@ function setupEnhancementButtons() {
     // Noise Reduction
     document.getElementById('noise-reduction-btn').addEventListener('click', function() {
         const strength = parseInt(document.getElementById('noise-slider').value);
-        applyEnhancement('noise_reduction', { strength });
+        const tier = document.querySelector('input[name="noise-tier"]:checked').value;
+        applyEnhancement('noise_reduction', { strength, tier });
     });
     
     // Update noise slider value
@@ -540,7 +553,8 @@ function setupEnhancementButtons() {
     
     document.getElementById('enhance-vessels-btn').addEventListener('click', function() {
         const strength = parseFloat(document.getElementById('vessel-slider').value);
-        applyEnhancement('enhance_vessels', { strength });
+        const mode = document.querySelector('input[name="vessel-mode"]:checked').value;
+        applyEnhancement('enhance_vessels', { strength, mode });
     });
     
     // Point Processing Techniques
@@ -713,9 +727,17 @@ async function applyEnhancement(method, params = {}) {
     const processingIndicator = document.getElementById('processing-indicator');
     processingIndicator.style.display = 'block';
     
+    // Tag the request so the server can drop it if a newer one supersedes it
+    const seq = ++enhanceSeq;
+    
     try {
         console.log(`Applying enhancement: ${method} with params:`, params);
         
+        // Point operations are rendered locally; spatial filters go to the server
+        if (LUT_METHODS.has(method) && await applyPointLut(method, params, seq)) {
+            return;
+        }
+        
         // Convert canvas to blob
         const blob = await new Promise(resolve => {
             canvas.toBlob(resolve, 'image/png');
@@ -730,24 +752,54 @@ async function applyEnhancement(method, params = {}) {
         formData.append('image', blob, 'uploaded_image.png');
         formData.append('method', method);
         
+        formData.append('client_id', clientId);
+        formData.append('seq', seq);
+        
         // Add parameters
         Object.entries(params).forEach(([key, val]) => {
             formData.append(key, val);
         });
         
+        const progressive = PROGRESSIVE_METHODS.has(method);
+        if (progressive) {
+            formData.append('progressive', 'true');
+        }
+        
         // Send request
         const response = await fetch('/enhance', {
             method: 'POST',
             body: formData
         });
         
+        // Ignore superseded or out-of-order responses; the newer request will update the canvas
+        if (response.status === 409 || seq !== enhanceSeq) {
+            return;
+        }
+        
         if (!response.ok) {
             const errorData = await response.json();
             throw new Error(errorData.error || 'Failed to process image');
         }
         
-        // Handle color palette differently than regular image enhancements
-        if (method === 'extract_palette') {
+        if (progressive) {
+            // Draw the preview as soon as it arrives, then swap in the final image
+            await readServerEvents(response, async (event, payload) => {
+                if (seq !== enhanceSeq || event === 'superseded') {
+                    return;
+                }
+                if (event === 'error') {
+                    throw new Error(payload.error || 'Failed to process image');
+                }
+                const imageBlob = await (await fetch(payload.image)).blob();
+                const img = await createImageBitmap(imageBlob);
+                
+                // The preview is stretched to the canvas until the final image replaces it
+                currentImage = img;
+                ctx.clearRect(0, 0, canvas.width, canvas.height);
+                ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
+                updateComparisonSlider();
+            });
+        } else if (method === 'extract_palette') {
             // Get JSON with palette data instead of image
             const paletteData = await response.json();
             
@@ -785,9 +837,104 @@ async function applyEnhancement(method, params = {}) {
         // Display error message
         alert(`Error: ${errorMessage}`);
     } finally {
-        // Hide processing indicator
-        processingIndicator.style.display = 'none';
+        // Hide processing indicator unless a newer request is still running
+        if (seq === enhanceSeq) {
+            processingIndicator.style.display = 'none';
+        }
+    }
+}
+
+// Read a text/event-stream response, calling onEvent(name, payload) for each JSON event
+async function readServerEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            await onEvent(event, data ? JSON.parse(data) : {});
+        }
+    }
+}
+
+// Apply a point operation in the browser using its lookup table
+// seq is the request's sequence number; returns false if the server cannot express the operation as a table
+async function applyPointLut(method, params, seq) {
+    const formData = new FormData();
+    formData.append('method', method);
+    Object.entries(params).forEach(([key, val]) => {
+        formData.append(key, val);
+    });
+    
+    // Image-dependent tables need the image itself
+    if (LUT_IMAGE_METHODS.has(method)) {
+        const blob = await new Promise(resolve => {
+            canvas.toBlob(resolve, 'image/png');
+        });
+        formData.append('image', blob, 'uploaded_image.png');
+    }
+    
+    const response = await fetch('/point-lut', {
+        method: 'POST',
+        body: formData
+    });
+    
+    if (!response.ok) {
+        return false;
+    }
+    
+    const { lut, grayscale } = await response.json();
+    
+    // A newer request has been issued meanwhile
+    if (seq !== enhanceSeq) {
+        return true;
+    }
+    
+    const lutR = Uint8Array.from(lut.r);
+    const lutG = Uint8Array.from(lut.g);
+    const lutB = Uint8Array.from(lut.b);
+    
+    const imageData = ctx.getImageData(0, 0, canvas.width, canvas.height);
+    const data = imageData.data;
+    for (let i = 0; i < data.length; i += 4) {
+        let r = data[i], g = data[i + 1], b = data[i + 2];
+        if (grayscale) {
+            // Same fixed-point BT.601 luma as OpenCV's BGR2GRAY
+            r = g = b = (r * 9798 + g * 19235 + b * 3735 + 16384) >> 15;
+        }
+        data[i] = lutR[r];
+        data[i + 1] = lutG[g];
+        data[i + 2] = lutB[b];
     }
+    
+    // Update current image
+    currentImage = await createImageBitmap(imageData);
+    
+    // Draw processed image
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.drawImage(currentImage, 0, 0, canvas.width, canvas.height);
+    
+    // Update comparison slider
+    updateComparisonSlider();
+    return true;
 }
 
 // Comparison Slider Setup
@@ -936,6 +1083,7 @@ function resetImage() {
     // Reset noise reduction
     document.getElementById('noise-slider').value = 7;
     document.getElementById('noise-value').textContent = '7';
+    document.getElementById('noise-tier-auto').checked = true;
     
     // Reset sharpen
     document.getElementById('sharpen-slider').value = 1;
@@ -956,6 +1104,7 @@ function resetImage() {
     // Reset vessel enhancement
     document.getElementById('vessel-slider').value = 1.5;
     document.getElementById('vessel-value').textContent = '1.5';
+    document.getElementById('vessel-mode-unsharp').checked = true;
     
     // Reset point processing technique sliders
     document.getElementById('bit-plane-slider').value = 7;
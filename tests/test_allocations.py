@@ -0,0 +1,115 @@
+"""
+Allocation checks for the out= and inplace= modes of ImageProcessor
+
+tracemalloc sees every NumPy array, including the ones OpenCV returns, but
+not OpenCV's internal C++ scratch buffers. Budgets are counted in planes:
+one full-resolution single-channel uint8 buffer (a BGR image is 3 planes).
+
+Run with:
+    python -m pytest tests
+"""
+import tracemalloc
+import numpy as np
+import pytest
+from backend.image_processor import ImageProcessor
+
+SIZE = 512
+PLANE = SIZE * SIZE
+
+# Method -> (keyword arguments, planes allocated when writing into out= or in place)
+ALLOCATION_BUDGETS = {
+    'histogram_equalization': ({}, 4),  # YUV conversion plus the equalized Y plane
+    'gamma_correction': ({'gamma': 2.2}, 0),
+    'unsharp_mask': ({'kernel_size': (5, 5), 'amount': 1.5}, 3),  # blurred image
+    'gaussian_blur': ({'radius': 4}, 0),
+    'edge_detection': ({'method': 'sobel'}, 11),  # float32 gradients and magnitude
+    'color_balance': ({'r_factor': 1.3}, 0),
+    'sepia_filter': ({}, 3),  # sepia-toned image
+    'noise_reduction': ({'strength': 3}, 3),  # denoised image
+    'sharpen': ({}, 0),
+    'clahe_enhance': ({}, 4),  # LAB conversion plus the equalized L plane
+    'dicom_window': ({}, 1),  # grayscale plane
+    'enhance_vessels': ({}, 3),  # blurred image
+    'bit_plane_slicing': ({}, 1),  # grayscale plane
+    'log_transformation': ({}, 0),
+    'gray_level_slicing': ({}, 1),  # grayscale plane
+    'piecewise_linear_transform': ({'points': [[0, 0], [64, 32], [192, 224], [255, 255]]}, 1),
+}
+
+# Allowance for LUTs, kernels and other small per-call objects
+SLACK = 0.25
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return ImageProcessor()
+
+
+@pytest.fixture(scope='module')
+def image():
+    return (np.random.default_rng(0).random((SIZE, SIZE, 3)) * 255).astype(np.uint8)
+
+
+def traced_peak(func):
+    """
+    Run func under tracemalloc
+
+    Returns:
+        Tuple of (result, peak traced bytes)
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+@pytest.mark.parametrize('method', ALLOCATION_BUDGETS)
+def test_out_buffer_allocations(processor, image, method):
+    kwargs, budget = ALLOCATION_BUDGETS[method]
+    func = getattr(processor, method)
+    expected = func(image.copy(), **kwargs)
+
+    out = np.empty_like(image)
+    result, peak = traced_peak(lambda: func(image, out=out, **kwargs))
+
+    assert result is out
+    np.testing.assert_array_equal(result, expected)
+    assert peak / PLANE <= budget + SLACK, f"{method} allocated {peak / PLANE:.2f} planes"
+
+
+@pytest.mark.parametrize('method', ALLOCATION_BUDGETS)
+def test_inplace_allocations(processor, image, method):
+    kwargs, budget = ALLOCATION_BUDGETS[method]
+    func = getattr(processor, method)
+    expected = func(image.copy(), **kwargs)
+
+    img = image.copy()
+    result, peak = traced_peak(lambda: func(img, inplace=True, **kwargs))
+
+    assert result is img
+    np.testing.assert_array_equal(result, expected)
+    assert peak / PLANE <= budget + SLACK, f"{method} allocated {peak / PLANE:.2f} planes"
+
+
+@pytest.mark.parametrize('method', ['gamma_correction', 'gaussian_blur', 'sharpen', 'color_balance'])
+def test_default_mode_allocates_only_the_result(processor, image, method):
+    kwargs, _ = ALLOCATION_BUDGETS[method]
+    result, peak = traced_peak(lambda: getattr(processor, method)(image, **kwargs))
+
+    assert result is not image
+    assert peak / PLANE <= 3 + SLACK
+
+
+def test_out_and_inplace_are_exclusive(processor, image):
+    with pytest.raises(ValueError):
+        processor.gamma_correction(image.copy(), out=np.empty_like(image), inplace=True)
+
+
+def test_mismatched_out_buffer_is_rejected(processor, image):
+    with pytest.raises(ValueError):
+        processor.gaussian_blur(image, out=np.empty((SIZE, SIZE), dtype=np.uint8))
@@ -0,0 +1,42 @@
+"""
+Tests of the multi-scale Hessian (Frangi) vesselness filter
+"""
+import cv2
+import numpy as np
+import pytest
+from backend.vesselness import VesselnessFilter
+
+
+def padded_angiogram(size=512, border=96):
+    """Dark vessels inside a bright disc on an exactly zero background (as in fundus images)"""
+    img = np.zeros((size, size), dtype=np.uint8)
+    cv2.circle(img, (size // 2, size // 2), size // 2 - border, 180, -1)
+    cv2.line(img, (size // 4, size // 2), (3 * size // 4, size // 2), 90, 5)
+    cv2.line(img, (size // 2, size // 4), (size // 2, 3 * size // 4), 90, 9)
+    return img
+
+
+@pytest.mark.parametrize('dark_vessels', [True, False])
+def test_flat_regions_give_finite_response(dark_vessels):
+    response = VesselnessFilter().vesselness(padded_angiogram(), dark_vessels=dark_vessels)
+
+    assert np.isfinite(response).all()
+    assert response.max() == pytest.approx(1.0)
+    assert response.min() >= 0
+
+
+def test_zero_image_gives_zero_response():
+    response = VesselnessFilter().vesselness(np.zeros((128, 128), dtype=np.uint8), dark_vessels=False)
+
+    assert np.isfinite(response).all()
+    assert not response.any()
+
+
+def test_full_strength_replaces_vessel_pixels():
+    img = padded_angiogram()
+    vesselness = VesselnessFilter()
+    peak = np.unravel_index(np.argmax(vesselness.vesselness(img)), img.shape)
+    result = vesselness.enhance(img, strength=3.0)
+
+    # The strongest vessel response is pushed all the way to black
+    assert result[peak] == 0